@@ -0,0 +1,335 @@
+import hashlib
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+from flask import current_app
+from sqlalchemy import text
+from api.models import db, CacheEntry
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedValue:
+    value: bytes
+    created_at: float # unix timestamp
+    fresh: bool
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+class CacheBackend(ABC):
+    """
+    Interface of a cache tier storing bytes under string keys.
+    Backends only evict entries older than max_age; freshness is decided by TieredCache.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+
+    @abstractmethod
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, created_at: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+class MemoryCache(CacheBackend):
+    """
+    Bounded in-process LRU cache.
+    """
+
+    def __init__(self, max_age: float, max_entries: int = 256):
+        super().__init__(max_age)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            # evict expired entries on access
+            if time.time() - entry[1] >= self.max_age:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: bytes, created_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+
+            # evict least recently used entries beyond the size cap
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+class DatabaseCache(CacheBackend):
+    """
+    Cache shared between instances, stored in the CacheEntry table.
+    """
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        try:
+            entry = db.session.get(CacheEntry, key)
+            if entry is None or time.time() - entry.created_at >= self.max_age:
+                return None
+            return entry.value, entry.created_at
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error reading cache entry from database: {str(e)}")
+            return None
+
+    def set(self, key: str, value: bytes, created_at: float) -> None:
+        try:
+            db.session.merge(CacheEntry(key=key, value=value, created_at=created_at))
+
+            # evict expired entries
+            CacheEntry.query.filter(CacheEntry.created_at < time.time() - self.max_age).delete(synchronize_session=False)
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error writing cache entry to database: {str(e)}")
+
+    def delete(self, key: str) -> None:
+        try:
+            CacheEntry.query.filter_by(key=key).delete(synchronize_session=False)
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error deleting cache entry from database: {str(e)}")
+
+class TieredCache:
+    """
+    Cache consisting of several tiers, checked in order (e.g. in-process LRU in front of the database).
+    Entries younger than ttl are fresh, entries up to ttl + stale_ttl old may be served while they are revalidated.
+    """
+
+    def __init__(self, tiers: list[CacheBackend], ttl: float, stale_ttl: float = 0):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._revalidating: set[str] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedValue | None:
+        """
+        Look up a key in all tiers.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            CachedValue | None: The cached value, None on a miss.
+        """
+
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get(key)
+            if entry is None:
+                continue
+
+            # promote to faster tiers
+            for faster in self.tiers[:i]:
+                faster.set(key, *entry)
+
+            value, created_at = entry
+            return CachedValue(value, created_at, fresh=time.time() - created_at < self.ttl)
+
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        """
+        Store a value in all tiers.
+
+        Args:
+            key (str): The cache key.
+            value (bytes): The value to store.
+        """
+
+        created_at = time.time()
+        for tier in self.tiers:
+            tier.set(key, value, created_at)
+
+    def delete(self, key: str) -> None:
+        """
+        Remove a key from all tiers.
+
+        Args:
+            key (str): The cache key.
+        """
+
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def revalidate(self, key: str, regenerate: Callable[[], Any]) -> None:
+        """
+        Regenerate a stale entry in a background thread, at most once at a time per key.
+
+        Args:
+            key (str): The cache key.
+            regenerate (Callable[[], Any]): Function producing and storing the new value, run inside an app context.
+        """
+
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    regenerate()
+                    logger.debug("Revalidated stale cache entry")
+            except Exception as e:
+                logger.error(f"Error revalidating cache entry: {str(e)}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+@contextmanager
+def advisory_lock(key: str) -> Iterator[bool]:
+    """
+    Try to take a database advisory lock, held until the context exits.
+    Advisory locks are only supported on Postgres; other databases always grant the lock.
+
+    Args:
+        key (str): The key to lock.
+
+    Yields:
+        bool: True if the lock was acquired, False if another instance holds it.
+    """
+
+    if db.engine.dialect.name != 'postgresql':
+        yield True
+        return
+
+    lock_id = int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'big', signed=True)
+    with db.engine.connect() as connection:
+        acquired = connection.execute(text('SELECT pg_try_advisory_lock(:id)'), {'id': lock_id}).scalar()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': lock_id})
+
+class SingleFlight:
+    """
+    Coalesce concurrent generation of the same value, so only one caller regenerates it while the others
+    wait for its result (or get a stale copy). Callers are coordinated by an in-process lock per key
+    and by a database advisory lock across instances.
+    """
+
+    def __init__(self, poll_interval: float = 0.5, max_wait: float = 30.0):
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._locks: dict[str, list] = {} # lock and number of callers per key
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _local_lock(self, key: str, timeout: float) -> Iterator[bool]:
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        acquired = entry[0].acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                entry[0].release()
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def run(self, key: str, generate: Callable[[], Any], lookup: Callable[[], Any], stale: Any = None, timeout: float = 30.0) -> Any:
+        """
+        Get a value, generating it only if no other caller is already doing so.
+
+        Args:
+            key (str): Identity of the value (e.g. feed fingerprint, or user and day).
+            generate (Callable[[], Any]): Function producing the value and storing it where lookup finds it.
+            lookup (Callable[[], Any]): Function returning the stored, fresh value, or None.
+            stale (Any): Value to return right away if another caller is generating, None to wait for it.
+            timeout (float): Seconds to wait for another caller before generating anyway (at most max_wait).
+
+        Returns:
+            Any: The value.
+        """
+
+        timeout = min(timeout, self.max_wait)
+
+        with self._local_lock(key, timeout) as acquired_local:
+
+            # another thread may have produced the value while we waited
+            value = lookup()
+            if value is not None:
+                return value
+            if not acquired_local:
+                logger.warning("Timed out waiting for concurrent generation")
+                return stale if stale is not None else generate()
+
+            with advisory_lock(key) as acquired:
+                if acquired:
+                    value = lookup() # another instance may have just finished
+                    return value if value is not None else generate()
+
+            # another instance is generating the value
+            if stale is not None:
+                logger.debug("Value is being generated by another instance, returning stale copy")
+                return stale
+
+            logger.debug("Value is being generated by another instance, waiting for it")
+            give_up = time.monotonic() + timeout
+            while time.monotonic() < give_up:
+                time.sleep(self.poll_interval)
+                value = lookup()
+                if value is not None:
+                    return value
+
+            logger.warning("Timed out waiting for another instance, generating anyway")
+            return generate()
+
+def create_cache(backend: str, ttl: float, stale_ttl: float, max_entries: int) -> TieredCache:
+    """
+    Create a tiered cache for the configured backend.
+
+    Args:
+        backend (str): 'memory' for an in-process cache only, 'database' for an in-process LRU in front of the database.
+        ttl (float): Seconds an entry is fresh.
+        stale_ttl (float): Seconds a stale entry may be served while it is revalidated.
+        max_entries (int): Size cap of the in-process tier.
+
+    Returns:
+        TieredCache: The cache.
+    """
+
+    tiers: list[CacheBackend] = [MemoryCache(ttl + stale_ttl, max_entries=max_entries)]
+    if backend == 'database':
+        tiers.append(DatabaseCache(ttl + stale_ttl))
+    return TieredCache(tiers, ttl=ttl, stale_ttl=stale_ttl)
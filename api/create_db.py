@@ -0,0 +1,7 @@
+# usage: python -m api.create_db (run once per deployment, and after adding models)
+from api.models import db
+from api.index import app, logger
+
+with app.app_context():
+    db.create_all()
+    logger.info("Created all tables")
@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from api.cache import MemoryCache
+from api.models import db, User
+
+logger = logging.getLogger(__name__)
+
+KEY_NAMES = ('zotero_user_id', 'zotero_api_key', 'semantic_scholar_api_key')
+
+def user_ciphertexts(user: User) -> dict[str, str | None]:
+    """
+    Get the encrypted API keys of a user.
+
+    Args:
+        user (User): The user.
+
+    Returns:
+        dict[str, str | None]: The encrypted API keys by name.
+    """
+
+    return {
+        'zotero_user_id': user.zotero_user_id_encrypted,
+        'zotero_api_key': user.zotero_api_key_encrypted,
+        'semantic_scholar_api_key': user.semantic_scholar_api_key_encrypted
+    }
+
+class CredentialCache:
+    """
+    Short-lived in-process cache of decrypted API keys, keyed by a digest of their ciphertexts.
+    Changed keys have different ciphertexts, so an entry never outlives the keys it was decrypted from.
+    Decrypted values are never logged.
+    """
+
+    def __init__(self, cipher: Fernet, ttl: float, max_entries: int = 1024):
+        self.cipher = cipher
+        self._cache = MemoryCache(ttl, max_entries=max_entries)
+
+    @staticmethod
+    def _key(encrypted: dict[str, str | None]) -> str:
+        digest = hashlib.sha256()
+        for name in KEY_NAMES:
+            digest.update((encrypted.get(name) or '').encode() + b'\0')
+        return digest.hexdigest()
+
+    def decrypt(self, encrypted: dict[str, str | None]) -> dict[str, str]:
+        """
+        Decrypt API keys, reusing recently decrypted ones.
+
+        Args:
+            encrypted (dict[str, str | None]): The encrypted API keys by name.
+
+        Returns:
+            dict[str, str]: The API keys, empty if missing or invalid.
+        """
+
+        key = self._key(encrypted)
+        entry = self._cache.get(key)
+        if entry is not None:
+            return dict(entry[0])
+
+        keys = {}
+        for name in KEY_NAMES:
+            keys[name] = ''
+            if encrypted.get(name):
+                try:
+                    keys[name] = self.cipher.decrypt(encrypted[name].encode()).decode()
+                except InvalidToken:
+                    logger.error(f"Failed to decrypt {name}")
+
+        self._cache.set(key, keys, time.time())
+        return dict(keys)
+
+    def invalidate(self, encrypted: dict[str, str | None]) -> None:
+        """
+        Drop decrypted API keys from the cache.
+
+        Args:
+            encrypted (dict[str, str | None]): The encrypted API keys by name.
+        """
+
+        self._cache.delete(self._key(encrypted))
+
+class UserCache:
+    """
+    Short-lived in-process cache of user rows for the login manager's user loader.
+    Cached rows are attached to the current database session without a query.
+    Other instances see changes to a user after at most ttl seconds.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self._cache = MemoryCache(ttl, max_entries=max_entries)
+        self._columns = [column.key for column in inspect(User).column_attrs]
+
+    def get(self, user_id: int) -> User | None:
+        """
+        Load a user, from the cache if possible.
+
+        Args:
+            user_id (int): The user ID.
+
+        Returns:
+            User | None: The user, attached to the current session, None if there is no such user.
+        """
+
+        entry = self._cache.get(str(user_id))
+        if entry is not None:
+            user = User(**entry[0])
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self._cache.set(str(user_id), {name: getattr(user, name) for name in self._columns}, time.time())
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drop a user from the cache, e.g. after it was changed.
+
+        Args:
+            user_id (int): The user ID.
+        """
+
+        self._cache.delete(str(user_id))
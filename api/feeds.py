@@ -0,0 +1,139 @@
+import json
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from typing import Iterator
+from xml.sax.saxutils import escape, quoteattr
+from api.papers import Paper
+
+FEED_TITLE = 'Paper Recommendations'
+FEED_DESCRIPTION = 'Latest paper recommendations based on your Zotero library'
+
+# content types by feed format
+FORMATS = {
+    'rss': 'application/rss+xml',
+    'atom': 'application/atom+xml',
+    'json': 'application/feed+json'
+}
+
+def _as_datetime(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+def iter_rss(recommendations: list[Paper], link: str, updated: datetime) -> Iterator[str]:
+    """
+    Serialize recommendations as RSS 2.0.
+
+    Args:
+        recommendations (list[Paper]): The recommendations to include.
+        link (str): The URL the feed links to.
+        updated (datetime): Time of the last update.
+
+    Yields:
+        str: Chunks of the feed XML.
+    """
+
+    yield "<?xml version='1.0' encoding='UTF-8'?>\n"
+    yield '<rss xmlns:dc="http://purl.org/dc/elements/1.1/" version="2.0"><channel>'
+    yield f'<title>{escape(FEED_TITLE)}</title><link>{escape(link)}</link>'
+    yield f'<description>{escape(FEED_DESCRIPTION)}</description><language>en</language>'
+    yield f'<lastBuildDate>{format_datetime(updated)}</lastBuildDate>'
+
+    for paper in recommendations:
+        yield f'<item><title>{escape(paper.title)}</title><link>{escape(paper.url)}</link>'
+        yield f'<description>{escape(paper.abstract)}</description>'
+        yield f'<dc:creator>{escape(", ".join(paper.authors))}</dc:creator>'
+        if paper.url:
+            yield f'<guid isPermaLink="true">{escape(paper.url)}</guid>'
+        if paper.published:
+            yield f'<pubDate>{format_datetime(_as_datetime(paper.published))}</pubDate>'
+        yield '</item>'
+
+    yield '</channel></rss>'
+
+def iter_atom(recommendations: list[Paper], link: str, updated: datetime) -> Iterator[str]:
+    """
+    Serialize recommendations as Atom.
+
+    Args:
+        recommendations (list[Paper]): The recommendations to include.
+        link (str): The URL the feed links to.
+        updated (datetime): Time of the last update.
+
+    Yields:
+        str: Chunks of the feed XML.
+    """
+
+    yield "<?xml version='1.0' encoding='UTF-8'?>\n"
+    yield '<feed xmlns="http://www.w3.org/2005/Atom">'
+    yield f'<id>{escape(link)}</id><title>{escape(FEED_TITLE)}</title><subtitle>{escape(FEED_DESCRIPTION)}</subtitle>'
+    yield f'<link href={quoteattr(link)}/><updated>{updated.isoformat()}</updated>'
+
+    for paper in recommendations:
+        entry_updated = _as_datetime(paper.published) if paper.published else updated
+        yield f'<entry><id>{escape(paper.url or paper.title)}</id><title>{escape(paper.title)}</title>'
+        yield f'<link href={quoteattr(paper.url)}/><updated>{entry_updated.isoformat()}</updated>'
+        if paper.published:
+            yield f'<published>{entry_updated.isoformat()}</published>'
+        for author in paper.authors:
+            yield f'<author><name>{escape(author)}</name></author>'
+        yield f'<summary>{escape(paper.abstract)}</summary></entry>'
+
+    yield '</feed>'
+
+def iter_json(recommendations: list[Paper], link: str, updated: datetime) -> Iterator[str]:
+    """
+    Serialize recommendations as JSON Feed 1.1.
+
+    Args:
+        recommendations (list[Paper]): The recommendations to include.
+        link (str): The URL the feed links to.
+        updated (datetime): Time of the last update.
+
+    Yields:
+        str: The feed JSON.
+    """
+
+    items = []
+    for paper in recommendations:
+        item = {
+            'id': paper.url or paper.title,
+            'url': paper.url,
+            'title': paper.title,
+            'content_text': paper.abstract,
+            'authors': [{'name': author} for author in paper.authors]
+        }
+        if paper.published:
+            item['date_published'] = _as_datetime(paper.published).isoformat()
+        items.append(item)
+
+    yield json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': FEED_TITLE,
+        'description': FEED_DESCRIPTION,
+        'home_page_url': link,
+        'language': 'en',
+        'items': items
+    }, separators=(',', ':'))
+
+SERIALIZERS = {
+    'rss': iter_rss,
+    'atom': iter_atom,
+    'json': iter_json
+}
+
+def serialize(recommendations: list[Paper], link: str, format: str = 'rss', updated: datetime = None) -> bytes:
+    """
+    Serialize recommendations as a feed, without building a document tree.
+
+    Args:
+        recommendations (list[Paper]): The recommendations to include.
+        link (str): The URL the feed links to.
+        format (str): The feed format ('rss', 'atom' or 'json').
+        updated (datetime): Time of the last update, by default the start of today (UTC).
+
+    Returns:
+        bytes: The feed.
+    """
+
+    if updated is None:
+        updated = _as_datetime(datetime.now().date())
+    return ''.join(SERIALIZERS[format](recommendations, link, updated)).encode()
@@ -0,0 +1,20 @@
+# usage: python -m api.import_library
+from api.models import User
+from api.index import app, logger, import_library
+
+with app.app_context():
+    users = User.query.filter(
+        User.zotero_user_id_encrypted.isnot(None),
+        User.zotero_api_key_encrypted.isnot(None)
+    ).all()
+
+    for user in users:
+        keys = {
+            'zotero_user_id': user.get_zotero_user_id() or '',
+            'zotero_api_key': user.get_zotero_api_key() or ''
+        }
+        if not keys['zotero_user_id'] or not keys['zotero_api_key']:
+            continue
+
+        complete = import_library(keys, time_budget=None)
+        logger.debug("Imported library for user %s (complete: %s)", user.id, complete)
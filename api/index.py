@@ -1,23 +1,48 @@
+from __future__ import annotations
 import os
-from datetime import datetime, timezone
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, Response, session
+from datetime import datetime, timezone, timedelta
+from flask import Flask, current_app, render_template, jsonify, request, redirect, url_for, flash, Response, session, g, before_render_template, template_rendered
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_wtf.csrf import CSRFProtect, generate_csrf
-from pyzotero import zotero
-import requests
 import json
 import logging
-from feedgen.feed import FeedGenerator
-import random
 import time
 from dotenv import load_dotenv
-from api.models import db, User # NOTE: remove api if wipe_db.py is run locally
+from api.models import db, User, LibraryItem, LibraryLabel, LibrarySync, LibraryChange, PaperMetadata, PaperEmbedding, CandidatePaper, DailyRecommendation # NOTE: remove api if wipe_db.py is run locally
+from api.cache import CachedValue, create_cache, SingleFlight
+from api.ratelimit import RateLimiter
+from api.resilience import CircuitBreaker, Deadline, backoff_delay, parse_retry_after
+from api.feeds import FORMATS as FEED_FORMATS, serialize as serialize_feed
+from api.papers import Paper, parse_date
+from api.seeds import SeedIndex, SeedIndexCache, parse_strategy, seed_random
+from api import metrics
+from api.metrics import span
+from api.profiling import is_profiled_path, start_profile, profile_report
+from api.credentials import CredentialCache, UserCache, user_ciphertexts
+from api.upstream import executor as upstream_executor, http_session, zotero_client as create_zotero_client
 from cryptography.fernet import Fernet
 import urllib.parse
+import hmac
+import hashlib
+from functools import cached_property
+import zlib
+import gzip
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # heavy dependencies are imported where they are used, to keep cold starts fast
+    import requests
+    from pyzotero import zotero
+
+try:
+    import brotli # optional, for precompressed brotli feeds
+except ImportError:
+    brotli = None
 
 load_dotenv('.env.local')
 
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper()) # e.g. DEBUG, INFO, WARNING
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -32,46 +57,121 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # initialize database
 db.init_app(app)
+metrics.instrument_database()
 
 # initialize login manager
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-API_CALL_DELAY = 1.5 # seconds between API calls
-FEED_CACHE_TTL_SECONDS = 12 * 60 * 60 # duration of cache in seconds
+RATE_LIMITS = { # requests per second and burst size per API key
+    'zotero': (2.0, 5),
+    'semantic_scholar': (1.0, 1)
+}
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory') # 'memory' or 'database' (shared between instances)
+LIBRARY_NOTIFICATIONS = os.getenv('LIBRARY_NOTIFICATIONS', 'false').lower() == 'true' # library changes are notified (see api/stream_listener.py)
+LIBRARY_SYNC_MAX_AGE_SECONDS = 6 * 60 * 60 # duration a mirror is served without syncing if no changes are notified
+FEED_CACHE_TTL_SECONDS = (24 if LIBRARY_NOTIFICATIONS else 12) * 60 * 60 # duration of cache in seconds (feeds are regenerated on changes if notified)
+FEED_CACHE_STALE_SECONDS = 12 * 60 * 60 # duration a stale feed may be served while it is regenerated
+FEED_CACHE_MAX_ENTRIES = int(os.getenv('FEED_CACHE_MAX_ENTRIES', 256)) # size cap of the in-process cache
+FEED_CACHE_BACKEND = os.getenv('FEED_CACHE_BACKEND', 'database') # 'database' (shared) or 'memory'
+FEED_RENDERER = os.getenv('FEED_RENDERER', 'native') # 'native' serializer or 'feedgen' (reference implementation, RSS only)
+MIRROR_INITIAL_ITEMS = 100 # newest items mirrored on first sync of a library
+IMPORT_PAGE_SIZE = 100 # items per page of the full library import (Zotero API maximum)
+IMPORT_TIME_BUDGET_SECONDS = 10 # time spent on the full library import per request
+REQUEST_DEADLINE_SECONDS = 50 # time budget of a request, below the 60s function limit
+UPSTREAM_TIMEOUT_SECONDS = 15 # timeout of a single upstream call
+MIN_ATTEMPT_SECONDS = 2 # minimum time left to start another upstream attempt
+BREAKER_ERROR_THRESHOLD = 0.5 # share of failed upstream calls that opens the circuit breaker
+BREAKER_MIN_CALLS = 5 # upstream calls within the window before the circuit breaker can open
+BREAKER_WINDOW_SECONDS = 60 # duration of upstream call outcomes considered by the circuit breaker
+BREAKER_COOLDOWN_SECONDS = 30 # duration the circuit breaker fails fast before probing the upstream again
+STALE_FEED_MAX_AGE_SECONDS = 5 * 60 # client cache duration of feeds with stale (or no) recommendations
+LAST_GOOD_LOOKBACK_DAYS = 7 # days searched for the last good recommendations during outages
+STALE_WARNING = '110 - "Response is Stale"' # Warning header of responses with stale (or no) recommendations
+S2_API_URL = os.getenv('S2_API_URL', 'https://api.semanticscholar.org').rstrip('/') # e.g. local stand-in (see bench/)
+S2_RECOMMENDATIONS_URL = f"{S2_API_URL}/recommendations/v1/papers"
+S2_BATCH_URL = f"{S2_API_URL}/graph/v1/paper/batch"
+S2_PAPER_FIELDS = 'paperId,externalIds,title,authors,url,publicationDate,abstract'
+S2_BATCH_MAX_IDS = 500 # maximum number of papers per batch request
+RECOMMENDATION_POOL_FACTOR = 10 # candidates requested per recommendation
+PAPER_METADATA_TTL_SECONDS = 30 * 24 * 60 * 60 # duration paper metadata is cached
+CANDIDATE_POOL_MIN_FACTOR = 3 # recommendations are fetched again when fewer unshown candidates per recommendation are left
+CANDIDATE_POOL_MAX_SIZE = 200 # newest unshown candidates considered per day
+CANDIDATE_POOL_TTL_SECONDS = 30 * 24 * 60 * 60 # duration unshown candidates are kept
+S2_EMBEDDING_FIELD = 'embedding.specter_v2'
+RERANK_RECOMMENDATIONS = os.getenv('RERANK_RECOMMENDATIONS', 'true').lower() == 'true' # re-rank candidates by embeddings (requires numpy)
+RERANK_DIVERSITY = float(os.getenv('RERANK_DIVERSITY', 0.3)) # weight of diversity against relevance to the seed papers
+SEED_STRATEGY = os.getenv('SEED_STRATEGY', 'uniform') # e.g. 'recent', 'year', 'tag:<name>' or 'collection:<key>' (see api/seeds.py)
+parse_strategy(SEED_STRATEGY) # fail on startup if invalid
+CREDENTIAL_CACHE_TTL_SECONDS = 5 * 60 # duration decrypted API keys are kept in memory
+USER_CACHE_TTL_SECONDS = 60 # duration users are cached by the user loader
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'na')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'na')
 
 encryption_key = os.getenv('ENCRYPTION_KEY')
 cipher_suite = Fernet(encryption_key)
 
-# in-memory cache for RSS feed responses
-feed_cache: dict[str, dict] = {}
+# caches of decrypted API keys and users, to avoid decrypting and loading them on every request
+credential_cache = CredentialCache(cipher_suite, ttl=CREDENTIAL_CACHE_TTL_SECONDS)
+user_cache = UserCache(ttl=USER_CACHE_TTL_SECONDS)
 
-def decrypt_param(param: str) -> str:
-    """
-    Decrypt a URL parameter.
-
-    Args:
-        param (str): The URL parameter to decrypt.
-    
-    Returns:
-        str: The decrypted parameter.
-    """
-
-    try:
-        logger.debug(f"Attempting to decrypt: {param}")
-        decrypted = cipher_suite.decrypt(param.encode()).decode()
-        logger.debug(f"Decrypted: {decrypted}")
-        return decrypted
-    except Exception as e:
-        logger.error(f"Failed to decrypt param: {e}")
-        return ''
+@login_manager.user_loader
+def load_user(user_id):
+    return user_cache.get(int(user_id))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+    # profile a single request on demand (admin only), e.g. curl -u admin:password '.../feed.xml?...&profile=cumulative'
+    if request.args.get('profile') and is_profiled_path(request.path):
+        auth = request.authorization
+        if auth and verify_admin(auth.username, auth.password):
+            start_profile()
+
+@app.after_request
+def record_request_duration(response: Response) -> Response:
+    started = g.get('request_started') # missing if an earlier hook failed the request
+    if started is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unknown')
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Trace of %s: %s", request.path, metrics.format_trace())
+    if 'profiler' in g:
+        return profile_report(response, sort=request.args.get('profile'))
+    return response
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def record_template_duration(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        metrics.record_span('render_template', time.perf_counter() - started)
+
+# coalesces concurrent generation of the same feed or daily recommendations
+single_flight = SingleFlight()
+
+# seed sampling indexes of libraries, by library version
+seed_indexes = SeedIndexCache()
+
+def log_breaker_change(upstream: str, state: str) -> None:
+    logger.warning(f"Circuit breaker of {upstream} is {state}")
+    metrics.BREAKER_TRANSITIONS.inc(upstream=upstream, state=state)
+
+# circuit breakers of the upstream APIs (per instance), failing fast during outages
+breakers = {
+    upstream: CircuitBreaker(upstream, BREAKER_ERROR_THRESHOLD, BREAKER_MIN_CALLS, BREAKER_WINDOW_SECONDS, BREAKER_COOLDOWN_SECONDS, on_change=log_breaker_change)
+    for upstream in ('zotero', 'semantic_scholar')
+}
+
+# rate limiter for upstream API calls
+rate_limiter = RateLimiter(RATE_LIMITS, backend=RATE_LIMIT_BACKEND)
+
+# cache for RSS feed responses (in-process LRU in front of the shared database cache)
+feed_cache = create_cache(FEED_CACHE_BACKEND, ttl=FEED_CACHE_TTL_SECONDS, stale_ttl=FEED_CACHE_STALE_SECONDS, max_entries=FEED_CACHE_MAX_ENTRIES)
 
 def load_api_keys_from_url() -> dict:
     """
@@ -86,19 +186,14 @@ def load_api_keys_from_url() -> dict:
     s2_key = request.args.get('semantic_scholar_api_key')
     if z_uid and z_key and s2_key:
         logger.debug("Loading API keys from encrypted URL parameters")
-        return {
-            'zotero_user_id': decrypt_param(z_uid),
-            'zotero_api_key': decrypt_param(z_key),
-            'semantic_scholar_api_key': decrypt_param(s2_key)
-        }
+        return credential_cache.decrypt({
+            'zotero_user_id': z_uid,
+            'zotero_api_key': z_key,
+            'semantic_scholar_api_key': s2_key
+        })
     else:
         return load_api_keys()
 
-# create database tables
-with app.app_context():
-    db.create_all()
-    logger.debug("Created all tables") 
-
 def verify_admin(username: str, password: str) -> bool:
     """
     Verify admin credentials.
@@ -113,30 +208,38 @@ def verify_admin(username: str, password: str) -> bool:
 
     return username == ADMIN_USERNAME and password == ADMIN_PASSWORD
 
-def rate_limit():
+def rate_limit(upstream: str, api_key: str = '') -> float:
     """
-    Add a delay between API calls to prevent overloading.
+    Wait until an API call is within the rate limit of the upstream API key.
+
+    Args:
+        upstream (str): The upstream API ('zotero' or 'semantic_scholar').
+        api_key (str): The API key the call is made with.
+
+    Returns:
+        float: Seconds spent waiting.
     """
 
-    logger.debug(f"Rate limiting for {API_CALL_DELAY} seconds")
-    time.sleep(API_CALL_DELAY)
+    with span('rate_limit'):
+        waited = rate_limiter.acquire(upstream, api_key)
+    metrics.SLEEP_SECONDS.inc(waited, reason='rate_limit', upstream=upstream)
+    return waited
 
 def load_api_keys() -> dict:
     """
     Load API keys from user's encrypted storage or environment variables (if admin).
     For admin users, Semantic Scholar API key is loaded from environment.
+    Decrypted keys are reused within the request and, for a short time, across requests.
 
     Returns:
         dict: A dictionary containing the API keys.
     """
 
     if current_user.is_authenticated:
-        logger.debug("Loading API keys from user storage")
-        return {
-            'zotero_api_key': current_user.get_zotero_api_key() or '',
-            'zotero_user_id': current_user.get_zotero_user_id() or '',
-            'semantic_scholar_api_key': current_user.get_semantic_scholar_api_key() or ''
-        }
+        if 'api_keys' not in g:
+            logger.debug("Loading API keys from user storage")
+            g.api_keys = credential_cache.decrypt(user_ciphertexts(current_user))
+        return dict(g.api_keys)
     
     logger.debug("No API keys found")
     return {'zotero_api_key': '', 'zotero_user_id': '', 'semantic_scholar_api_key': ''}
@@ -150,110 +253,1093 @@ def save_api_keys(keys: dict) -> None:
     """
 
     if current_user.is_authenticated:
+        credential_cache.invalidate(user_ciphertexts(current_user))
         current_user.set_zotero_api_key(keys['zotero_api_key'])
         current_user.set_zotero_user_id(keys['zotero_user_id'])
         current_user.set_semantic_scholar_api_key(keys['semantic_scholar_api_key'])
         db.session.commit()
-        logger.debug(f"Saved API keys to user storage")
 
-def fetch_recent_papers(n_papers: int = 100, keys: dict = None) -> list:
+        # drop cached copies of the previous keys
+        user_cache.invalidate(current_user.id)
+        g.pop('api_keys', None)
+
+        # recommendations of the previous keys no longer apply
+        session.pop('daily_recommendation', None)
+        session.pop('last_refresh', None)
+        logger.debug("Saved API keys to user storage")
+
+def library_fingerprint(zotero_user_id: str) -> str:
+    """
+    Derive a stable identifier for a Zotero library without storing the user ID in plaintext.
+
+    Args:
+        zotero_user_id (str): The Zotero user ID.
+
+    Returns:
+        str: A hex HMAC-SHA256 digest of the user ID.
+    """
+
+    return hmac.new(encryption_key.encode(), zotero_user_id.encode(), hashlib.sha256).hexdigest()
+
+def key_fingerprint(api_key: str) -> str:
+    """
+    Derive an identifier for an API key without storing the key, to check which key a library mirror was synced with.
+
+    Args:
+        api_key (str): The Zotero API key.
+
+    Returns:
+        str: A hex HMAC-SHA256 digest of the API key.
+    """
+
+    return hmac.new(encryption_key.encode(), f"key:{api_key}".encode(), hashlib.sha256).hexdigest()
+
+def account_fingerprint(keys: dict) -> str:
+    """
+    Derive an identifier for the API keys of an account. Unlike the library fingerprint, it can't be derived
+    from the user ID alone, so it serves as a secret token for data generated with the keys (e.g. feeds).
+
+    Args:
+        keys (dict): A dictionary containing the API keys.
+
+    Returns:
+        str: A hex HMAC-SHA256 digest of the user ID and API keys.
+    """
+
+    message = '\n'.join(keys.get(name) or '' for name in ('zotero_user_id', 'zotero_api_key', 'semantic_scholar_api_key'))
+    return hmac.new(encryption_key.encode(), f"account:{message}".encode(), hashlib.sha256).hexdigest()
+
+def mark_library_changed(library: str, version: int) -> None:
+    """
+    Record a change notification of a library, so its mirror is synced and its feeds and recommendations are regenerated
+    on the next request instead of waiting for them to expire.
+
+    Args:
+        library (str): The library fingerprint.
+        version (int): The new library version.
+    """
+
+    try:
+        change = db.session.get(LibraryChange, library)
+        if change is None:
+            change = LibraryChange(library=library, version=0)
+            db.session.add(change)
+        change.version = max(change.version, version)
+        change.notified_at = time.time()
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error recording library change: {str(e)}")
+        return
+
+    # cached feeds of the library are regenerated on their next hit (see is_fresh_feed)
+    logger.debug("Marked library as changed (version %s)", version)
+
+def library_changed_since(library: str, timestamp: float) -> bool:
+    """
+    Check if a change of a library was notified after the given time.
+
+    Args:
+        library (str): The library fingerprint.
+        timestamp (float): Unix timestamp, e.g. of a cached feed.
+
+    Returns:
+        bool: True if the library changed since, always False if changes aren't notified.
+    """
+
+    if not LIBRARY_NOTIFICATIONS:
+        return False
+    try:
+        change = db.session.get(LibraryChange, library)
+        return change is not None and change.notified_at > timestamp
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error checking library changes: {str(e)}")
+        return False
+
+def store_library_items(library: str, items: list) -> None:
+    """
+    Insert or update Zotero items in the local library mirror.
+    Items without a DOI are dropped from the mirror, as they can't be used as seeds.
+
+    Args:
+        library (str): The library fingerprint.
+        items (list): Raw items as returned by the Zotero API.
+    """
+
+    if not items:
+        return
+
+    existing = {
+        row.key: row for row in LibraryItem.query.filter(
+            LibraryItem.library == library,
+            LibraryItem.key.in_([item['key'] for item in items])
+        )
+    }
+
+    # labels are replaced with those of the stored items
+    LibraryLabel.query.filter(
+        LibraryLabel.library == library,
+        LibraryLabel.key.in_([item['key'] for item in items])
+    ).delete(synchronize_session=False)
+
+    for item in items:
+        data = item['data']
+        row = existing.get(item['key'])
+
+        # only mirror papers with DOIs
+        if not data.get('DOI'):
+            if row is not None:
+                db.session.delete(row)
+            continue
+
+        version = item.get('version', data.get('version', 0))
+        if row is None:
+            row = LibraryItem(library=library, key=item['key'])
+            db.session.add(row)
+
+        # never overwrite a newer copy of the item
+        elif row.version > version:
+            continue
+
+        row.version = version
+        row.title = data.get('title', '')
+        row.authors = json.dumps([creator.get('name', '') for creator in data.get('creators', [])])
+        row.doi = data.get('DOI', '')
+        row.abstract = data.get('abstractNote', '')
+        row.date = data.get('date', '')
+        row.url = data.get('url', '')
+        row.date_added = data.get('dateAdded', '')
+
+        labels = {('tag', tag['tag'][:255]) for tag in data.get('tags', []) if tag.get('tag')}
+        labels |= {('collection', collection) for collection in data.get('collections', [])}
+        db.session.add_all(LibraryLabel(library=library, key=item['key'], kind=kind, value=value) for kind, value in labels)
+
+@span('sync_library')
+def sync_library(keys: dict) -> str:
+    """
+    Bring the local mirror of the user's Zotero library up to date.
+    Only items modified since the last synced library version are fetched, so an unchanged library costs a single round trip.
+
+    Args:
+        keys (dict): A dictionary containing the API keys.
+
+    Returns:
+        str: The library fingerprint identifying the mirror.
+    """
+
+    library = library_fingerprint(keys['zotero_user_id'])
+
+    fetched = False
+    try:
+        state = db.session.get(LibrarySync, library)
+        zotero_client = create_zotero_client(keys['zotero_user_id'], keys['zotero_api_key'])
+        rate_limit('zotero', keys['zotero_api_key']) # wait for rate limit before API call
+
+        # first sync (or no version recorded yet), mirror the newest items
+        if state is None or not state.version:
+            items = zotero_client.top(limit=MIRROR_INITIAL_ITEMS, sort='dateAdded', direction='desc')
+            if state is None:
+                state = LibrarySync(library=library, version=0, import_start=0, import_complete=False)
+                db.session.add(state)
+
+        # incremental sync, only fetch items changed since the last library version
+        else:
+            items = zotero_client.everything(zotero_client.top(since=state.version))
+
+        version = int(zotero_client.request.headers.get('last-modified-version', 0))
+        logger.debug("Fetched %s changed items from Zotero (version %s -> %s)", len(items), state.version, version)
+
+        # removals are only reported by the deleted and trash endpoints (restored items come back through since)
+        deleted_keys = []
+        if state.version and version > state.version:
+            rate_limit('zotero', keys['zotero_api_key'])
+            deleted_keys = zotero_client.deleted(since=state.version).get('items', [])
+            rate_limit('zotero', keys['zotero_api_key'])
+            deleted_keys += list(zotero_client.trash(since=state.version, format='versions', limit=None))
+
+        fetched = True
+        breakers['zotero'].record(True)
+        store_library_items(library, items)
+        if deleted_keys:
+            LibraryItem.query.filter(
+                LibraryItem.library == library,
+                LibraryItem.key.in_(deleted_keys)
+            ).delete(synchronize_session=False)
+            LibraryLabel.query.filter(
+                LibraryLabel.library == library,
+                LibraryLabel.key.in_(deleted_keys)
+            ).delete(synchronize_session=False)
+
+        state.version = max(state.version, version)
+        state.synced_at = datetime.now(timezone.utc)
+        state.api_key_hash = key_fingerprint(keys['zotero_api_key']) # the key grants access to the library
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error syncing library from Zotero: {str(e)}")
+        if not fetched:
+            breakers['zotero'].record(not is_zotero_outage(e))
+            revoke_api_key(library, keys['zotero_api_key'], e)
+
+    return library
+
+def is_verified_key(library: str, api_key: str) -> bool:
+    """
+    Check if an API key was verified against the library mirror, i.e. the last successful sync used it.
+    The mirror is only served to verified keys, as the library fingerprint can be derived from the user ID alone.
+
+    Args:
+        library (str): The library fingerprint.
+        api_key (str): The Zotero API key.
+
+    Returns:
+        bool: True if the mirror may be served to the key.
+    """
+
+    state = db.session.get(LibrarySync, library)
+    return state is not None and state.api_key_hash is not None and hmac.compare_digest(state.api_key_hash, key_fingerprint(api_key))
+
+def revoke_api_key(library: str, api_key: str, error: Exception) -> None:
+    """
+    Stop serving the library mirror to an API key if Zotero rejected it (e.g. revoked, or without access to the library).
+
+    Args:
+        library (str): The library fingerprint.
+        api_key (str): The Zotero API key.
+        error (Exception): The error raised by the Zotero call.
+    """
+
+    from pyzotero import zotero_errors
+
+    if not isinstance(error, zotero_errors.UserNotAuthorisedError):
+        return
+    try:
+        LibrarySync.query.filter_by(library=library, api_key_hash=key_fingerprint(api_key)).update({'api_key_hash': None}, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error revoking API key of library mirror: {str(e)}")
+
+def is_zotero_outage(error: Exception) -> bool:
+    """
+    Check if a failed Zotero call indicates a problem of the Zotero API (server error, no response),
+    rather than of the request (e.g. invalid API key), or of the local database.
+
+    Args:
+        error (Exception): The error raised by the call.
+
+    Returns:
+        bool: True if the error counts against the Zotero circuit breaker.
+    """
+
+    from pyzotero import zotero_errors
+    from sqlalchemy.exc import SQLAlchemyError
+
+    client_errors = (zotero_errors.UserNotAuthorisedError, zotero_errors.ResourceNotFoundError, zotero_errors.MissingCredentialsError)
+    return not isinstance(error, client_errors + (SQLAlchemyError,))
+
+def iter_library_pages(zotero_client: zotero.Zotero, start: int = 0, page_size: int = IMPORT_PAGE_SIZE, deadline: Deadline = None):
+    """
+    Page through all top-level items of a Zotero library, oldest first.
+    Sorting by date added keeps page offsets stable while new items are added (removed items shift them, see import_library).
+    The next page is fetched in the background while the consumer processes the current one,
+    so at most two pages are held in memory. No page is prefetched once the deadline expired,
+    and a prefetch that didn't start yet is cancelled when the consumer stops early.
+
+    Args:
+        zotero_client (zotero.Zotero): The Zotero client to use.
+        start (int): Offset of the first item to fetch.
+        page_size (int): Number of items per page.
+        deadline (Deadline): The time budget of the consumer, by default none.
+
+    Yields:
+        tuple[int, list, int]: The offset of the page, its raw items and the library version it was fetched at.
+    """
+
+    flask_app = current_app._get_current_object() # pages are fetched on the upstream executor
+
+    def fetch_page(page_start: int) -> tuple[list, int]:
+        with flask_app.app_context(): # e.g. for database rate limit buckets
+            rate_limit('zotero', zotero_client.api_key) # wait for rate limit before API call
+            items = zotero_client.top(start=page_start, limit=page_size, sort='dateAdded', direction='asc')
+            return items, int(zotero_client.request.headers.get('last-modified-version', 0))
+
+    if deadline is None:
+        deadline = Deadline(None)
+
+    next_page = upstream_executor.submit(fetch_page, start)
+    try:
+        while next_page is not None:
+            items, version = next_page.result()
+            if not items:
+                return
+
+            # prefetch the next page, unless this is the last one or the consumer is out of time
+            next_page = None
+            if len(items) == page_size and not deadline.expired():
+                next_page = upstream_executor.submit(fetch_page, start + len(items))
+
+            yield start, items, version
+            start += len(items)
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+def count_removed_items(zotero_client: zotero.Zotero, since: int) -> int:
+    """
+    Count the items deleted or moved to the trash since a library version.
+    Child items are counted too, so this is an upper bound of the removed top-level items.
+
+    Args:
+        zotero_client (zotero.Zotero): The Zotero client to use.
+        since (int): The library version.
+
+    Returns:
+        int: Number of removed items.
+    """
+
+    rate_limit('zotero', zotero_client.api_key) # wait for rate limit before API call
+    deleted = zotero_client.deleted(since=since).get('items', [])
+    rate_limit('zotero', zotero_client.api_key)
+    trashed = zotero_client.trash(since=since, format='versions', limit=None)
+    return len(deleted) + len(trashed)
+
+def import_library(keys: dict, time_budget: float | None = IMPORT_TIME_BUDGET_SECONDS) -> bool:
+    """
+    Import the full Zotero library into the local mirror, resuming from the last checkpoint.
+    Each page is written to the database as it arrives, so memory is bounded by the page size
+    and a large library can be ingested across several invocations.
+    Items removed from the library since the checkpoint move the following items to lower offsets,
+    so the import steps back by the number of removed items when the library version changed.
+
+    Args:
+        keys (dict): A dictionary containing the API keys.
+        time_budget (float | None): Seconds to spend importing, None to import until complete.
+
+    Returns:
+        bool: True if the library is fully imported, False otherwise.
+    """
+
+    library = library_fingerprint(keys['zotero_user_id'])
+    state = db.session.get(LibrarySync, library)
+    if state is None:
+        state = LibrarySync(library=library, version=0, import_start=0, import_complete=False)
+        db.session.add(state)
+        db.session.commit()
+
+    if state.import_complete:
+        return True
+
+    deadline = Deadline(time_budget)
+    try:
+        zotero_client = create_zotero_client(keys['zotero_user_id'], keys['zotero_api_key'])
+        rewound = True
+        while rewound:
+            rewound = False
+            for start, items, version in iter_library_pages(zotero_client, start=state.import_start, deadline=deadline):
+
+                # items removed since the checkpoint may have been skipped, step back and fetch again
+                if state.import_version and version > state.import_version:
+                    removed = count_removed_items(create_zotero_client(keys['zotero_user_id'], keys['zotero_api_key']), since=state.import_version)
+                    state.import_version = version
+                    if removed:
+                        logger.debug("%s items removed during import, stepping back", removed)
+                        state.import_start = max(0, start - removed)
+                        db.session.commit()
+                        rewound = True
+                        break
+
+                store_library_items(library, items)
+                state.import_start = start + len(items)
+                state.import_version = version
+                state.version = state.version or version # later changes are picked up by the incremental sync
+                state.api_key_hash = key_fingerprint(keys['zotero_api_key']) # the key grants access to the library
+                db.session.commit()
+                logger.debug("Imported %s items into library mirror", state.import_start)
+
+                if deadline.expired():
+                    logger.debug("Import time budget exhausted, resuming on next invocation")
+                    return False
+
+        state.import_complete = True
+        db.session.commit()
+        logger.debug("Completed full library import")
+        return True
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing library from Zotero: {str(e)}")
+        if is_zotero_outage(e):
+            breakers['zotero'].record(False)
+        revoke_api_key(library, keys['zotero_api_key'], e)
+        return False
+
+def mirror_is_current(library: str) -> bool:
+    """
+    Check if the library mirror is up to date according to change notifications: it's fully imported,
+    and was synced after the last notified change and recently enough in case notifications were missed.
+
+    Args:
+        library (str): The library fingerprint.
+
+    Returns:
+        bool: True if the mirror can be served without syncing.
+    """
+
+    state = db.session.get(LibrarySync, library)
+    if state is None or not state.import_complete or state.synced_at is None:
+        return False
+
+    synced_at = state.synced_at.replace(tzinfo=state.synced_at.tzinfo or timezone.utc).timestamp()
+    return time.time() - synced_at < LIBRARY_SYNC_MAX_AGE_SECONDS and not library_changed_since(library, synced_at)
+
+def refresh_library_mirror(keys: dict, deadline: Deadline = None, full: bool = False) -> str | None:
+    """
+    Bring the local library mirror up to date before serving it.
+    If the deadline is (nearly) reached or the Zotero circuit breaker is open, the mirror is served without syncing,
+    and so is a fully imported mirror without notified changes (if changes are notified).
+    The mirror is only served to the API key it was last synced with (see is_verified_key).
+
+    Args:
+        keys (dict): A dictionary containing the API keys.
+        deadline (Deadline): The time budget of the request.
+        full (bool): Whether the whole library is needed, i.e. the full import is continued within its time budget.
+
+    Returns:
+        str | None: The library fingerprint, None if the mirror may not be served to the keys.
+    """
+
+    if deadline is None:
+        deadline = Deadline(None)
+
+    try:
+        library = library_fingerprint(keys['zotero_user_id'])
+        if deadline.remaining() < MIN_ATTEMPT_SECONDS:
+            logger.warning("Deadline reached, serving library mirror without syncing")
+        elif LIBRARY_NOTIFICATIONS and mirror_is_current(library) and is_verified_key(library, keys['zotero_api_key']):
+            logger.debug("No library changes notified, serving library mirror without syncing")
+        elif not breakers['zotero'].allow():
+            logger.warning("Zotero circuit breaker is open, serving library mirror without syncing")
+            metrics.UPSTREAM_REJECTIONS.inc(upstream='zotero')
+        else:
+            library = sync_library(keys)
+            if full and breakers['zotero'].state == CircuitBreaker.CLOSED:
+                # leave time for the recommendations
+                import_library(keys, time_budget=min(IMPORT_TIME_BUDGET_SECONDS, deadline.remaining() / 4))
+
+        # the user ID alone doesn't grant access, e.g. if the sync was skipped or the key was rejected
+        if not is_verified_key(library, keys['zotero_api_key']):
+            logger.warning("Zotero API key not verified for library mirror")
+            return None
+        return library
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error refreshing library mirror: {str(e)}")
+        return None
+
+def library_paper(row: LibraryItem, user_id: str) -> Paper:
+    """
+    Convert a mirrored item to a paper, dates are only formatted when rendered.
+
+    Args:
+        row (LibraryItem): The mirrored item.
+        user_id (str): The Zotero user ID, for the link to the item.
+
+    Returns:
+        Paper: The paper.
+    """
+
+    published, raw_date = parse_date(row.date)
+    return Paper(
+        title=row.title,
+        authors=json.loads(row.authors or '[]'),
+        url=row.url,
+        abstract=row.abstract,
+        doi=row.doi,
+        published=published,
+        raw_date=raw_date,
+        zotero_url=f"https://www.zotero.org/groups/{user_id}/items/{row.key}"
+    )
+
+@span('fetch_recent_papers')
+def fetch_recent_papers(n_papers: int | None = 100, keys: dict = None, deadline: Deadline = None) -> list:
+    """
+    Fetch the last n_papers from Zotero.
+    Papers are served from the local library mirror, which is synced incrementally beforehand (see refresh_library_mirror).
+    When the whole library is requested, the full import is continued within its time budget.
+
+    Args:
+        n_papers (int | None): Number of papers to fetch, None for the whole library.
+        keys (dict): A dictionary containing the API keys.
+        deadline (Deadline): The time budget of the request.
+
+    Returns:
+        list[Paper]: The recent papers.
+    """
+
+    if keys is None:
+        keys = load_api_keys()
+    
+    if not keys['zotero_api_key'] or not keys['zotero_user_id']:
+        logger.debug("Missing Zotero API keys")
+        return []
+    
+    try:
+        library = refresh_library_mirror(keys, deadline, full=n_papers is None)
+        if library is None:
+            return []
+
+        rows = (LibraryItem.query
+                .filter_by(library=library)
+                .order_by(LibraryItem.date_added.desc(), LibraryItem.key)
+                .limit(n_papers)
+                .all())
+        papers = [library_paper(row, keys['zotero_user_id']) for row in rows]
+
+        logger.debug("Loaded %s papers with DOIs from library mirror", len(papers))
+        return papers
+    
+    except Exception as e:
+        logger.error(f"Error fetching papers from Zotero: {str(e)}")
+        return []
+
+def load_library_papers(library: str, item_keys: list[str], user_id: str) -> list:
+    """
+    Load selected papers from the library mirror.
+
+    Args:
+        library (str): The library fingerprint.
+        item_keys (list[str]): Keys of the items to load.
+        user_id (str): The Zotero user ID, for the links to the items.
+
+    Returns:
+        list[Paper]: The papers, in the order of item_keys.
+    """
+
+    try:
+        rows = {row.key: row for row in LibraryItem.query.filter(LibraryItem.library == library, LibraryItem.key.in_(item_keys))}
+        return [library_paper(rows[key], user_id) for key in item_keys if key in rows]
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error loading papers from library mirror: {str(e)}")
+        return []
+
+def load_seed_index(library: str) -> SeedIndex:
+    """
+    Get the seed sampling index of a library, built once per library version and kept in memory.
+    The index is built from the keys, dates and labels of the mirrored items, the papers are only loaded once selected.
+
+    Args:
+        library (str): The library fingerprint.
+
+    Returns:
+        SeedIndex: The index.
+    """
+
+    try:
+        state = db.session.get(LibrarySync, library)
+        key = (library, state.version if state else 0, LibraryItem.query.filter_by(library=library).count())
+        index = seed_indexes.get(key)
+        if index is None:
+            item_keys, years = [], []
+            rows = (db.session.query(LibraryItem.key, LibraryItem.date)
+                    .filter(LibraryItem.library == library)
+                    .order_by(LibraryItem.date_added.desc(), LibraryItem.key))
+            for item_key, date in rows:
+                published, _ = parse_date(date)
+                item_keys.append(item_key)
+                years.append(published.year if published else None)
+
+            labels = {}
+            rows = db.session.query(LibraryLabel.key, LibraryLabel.kind, LibraryLabel.value).filter(LibraryLabel.library == library)
+            for item_key, kind, value in rows:
+                labels.setdefault(item_key, []).append(f"{kind}:{value}")
+
+            index = SeedIndex.build(item_keys, years, labels)
+            seed_indexes.set(key, index)
+        return index
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error loading seed index: {str(e)}")
+        return SeedIndex.build([], [])
+
+def get_random_seed_papers(index: SeedIndex, n_seed_papers: int = 10, library: str = '', day=None, strategy: str = SEED_STRATEGY) -> list[str]:
+    """
+    Randomly select n_seed_papers from a library to use as seed for recommendations.
+    The selection only depends on the library, day and strategy, and uses its own random generator,
+    so it's reproducible across requests and instances and safe to run concurrently.
+
+    Args:
+        index (SeedIndex): The sampling index of the library (see load_seed_index).
+        n_seed_papers (int): Number of seed papers to select.
+        library (str): The library fingerprint.
+        day (date): The day of the selection, by default today.
+        strategy (str): The selection strategy (see api/seeds.py).
+
+    Returns:
+        list[str]: Item keys of up to n_seed_papers randomly selected papers.
+    """
+
+    # if less than n_seed_papers, return all papers
+    if len(index.keys) <= n_seed_papers:
+        return list(index.keys)
+
+    day = day or datetime.now().date()
+    seed_keys = index.sample(seed_random(library, day, strategy), n_seed_papers, strategy)
+    if not seed_keys:
+        # e.g. no papers with the tag or in the collection (yet)
+        logger.warning(f"No papers found for seed strategy {strategy}, selecting from all papers")
+        seed_keys = index.sample(seed_random(library, day, 'uniform'), n_seed_papers)
+
+    return seed_keys
+
+def post_semantic_scholar(url: str, payload: dict, params: dict, api_key: str, deadline: Deadline, max_attempts: int = 5) -> requests.Response | None:
+    """
+    Send a POST request to the Semantic Scholar API.
+    Rate limiting, server errors and timeouts are retried with jittered exponential backoff (honoring Retry-After)
+    as long as the deadline allows it. While the Semantic Scholar circuit breaker is open, no request is sent.
+
+    Args:
+        url (str): The endpoint to call.
+        payload (dict): The JSON payload.
+        params (dict): The query parameters.
+        api_key (str): The Semantic Scholar API key.
+        deadline (Deadline): The time budget of the request.
+        max_attempts (int): Maximum number of attempts.
+
+    Returns:
+        requests.Response | None: The successful response, None if all attempts failed.
+    """
+
+    import requests
+
+    headers = {
+        'x-api-key': api_key,
+        'Content-Type': 'application/json'
+    }
+
+    for attempt in range(max_attempts):
+
+        # give up rather than overrunning the deadline
+        if deadline.remaining() < MIN_ATTEMPT_SECONDS:
+            logger.warning(f"Deadline reached after {attempt} attempts")
+            return None
+
+        # fail fast during outages
+        if not breakers['semantic_scholar'].allow():
+            logger.warning(f"Semantic Scholar circuit breaker is open, giving up after {attempt} attempts")
+            metrics.UPSTREAM_REJECTIONS.inc(upstream='semantic_scholar')
+            return None
+
+        rate_limit('semantic_scholar', api_key) # wait for rate limit before API call
+        try:
+            with span('semantic_scholar_request'):
+                response = http_session().post(url, headers=headers, json=payload, params=params, timeout=deadline.timeout(UPSTREAM_TIMEOUT_SECONDS))
+            metrics.UPSTREAM_RESPONSES.inc(upstream='semantic_scholar', status=str(response.status_code))
+        except requests.RequestException as e:
+            logger.error(f"Semantic Scholar API request failed: {str(e)}")
+            metrics.UPSTREAM_RESPONSES.inc(upstream='semantic_scholar', status='error')
+            response = None
+
+        # rate limiting and client errors don't count as outages
+        breakers['semantic_scholar'].record(response is not None and response.status_code < 500)
+
+        # give up on client errors, retry on rate limiting, server errors and timeouts
+        retry_after = None
+        if response is not None:
+            if response.status_code == 200:
+                return response
+
+            logger.error(f"Semantic Scholar API error: {response.status_code} - {response.text}")
+            if response.status_code != 429 and response.status_code < 500:
+                return None
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+        if attempt == max_attempts - 1:
+            break
+
+        # back off before the next attempt, if there is time for it
+        delay = backoff_delay(attempt, retry_after)
+        if delay > deadline.remaining() - MIN_ATTEMPT_SECONDS:
+            logger.warning(f"Not enough time left to retry in {delay:.1f} seconds")
+            return None
+        logger.debug("Retrying in %.1f seconds", delay)
+        metrics.UPSTREAM_RETRIES.inc(upstream='semantic_scholar')
+        metrics.SLEEP_SECONDS.inc(delay, reason='backoff', upstream='semantic_scholar')
+        time.sleep(delay)
+
+    return None
+
+def is_complete_recommendation(paper: dict) -> bool:
+    """
+    Check if all required fields of a recommendation are present and non-empty.
+
+    Args:
+        paper (dict): The paper as returned by Semantic Scholar.
+
+    Returns:
+        bool: True if the paper is complete, False otherwise.
+    """
+
+    return all([
+        paper.get('title'),
+        paper.get('authors'),
+        paper.get('publicationDate'),
+        paper.get('abstract')
+    ])
+
+def store_paper_metadata(papers: list) -> None:
+    """
+    Store Semantic Scholar paper records in the paper metadata cache.
+
+    Args:
+        papers (list): Paper records as returned by Semantic Scholar.
+    """
+
+    now = time.time()
+    for paper in papers:
+        if paper and paper.get('paperId'):
+            db.session.merge(PaperMetadata(paper_id=paper['paperId'], data=json.dumps(paper), fetched_at=now))
+    db.session.commit()
+
+@span('hydrate_papers')
+def hydrate_papers(paper_ids: list, keys: dict, deadline: Deadline) -> dict[str, dict]:
+    """
+    Fetch full records for the given papers, from the paper metadata cache if possible,
+    else with a single request to the Semantic Scholar batch endpoint.
+
+    Args:
+        paper_ids (list): Semantic Scholar paper IDs.
+        keys (dict): A dictionary containing the API keys.
+        deadline (Deadline): The time budget of the request.
+
+    Returns:
+        dict[str, dict]: Paper records by paper ID (papers that couldn't be fetched are missing).
+    """
+
+    if not paper_ids:
+        return {}
+
+    papers = {}
+    try:
+        cached = PaperMetadata.query.filter(
+            PaperMetadata.paper_id.in_(paper_ids),
+            PaperMetadata.fetched_at >= time.time() - PAPER_METADATA_TTL_SECONDS
+        )
+        papers = {entry.paper_id: json.loads(entry.data) for entry in cached}
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error reading paper metadata cache: {str(e)}")
+
+    missing = [paper_id for paper_id in paper_ids if paper_id not in papers]
+    logger.debug("Hydrating %s papers (%s not cached)", len(paper_ids), len(missing))
+    metrics.CACHE_LOOKUPS.inc(len(paper_ids) - len(missing), cache='paper_metadata', result='hit')
+    metrics.CACHE_LOOKUPS.inc(len(missing), cache='paper_metadata', result='miss')
+    if not missing:
+        return papers
+
+    response = post_semantic_scholar(
+        S2_BATCH_URL,
+        payload={'ids': missing[:S2_BATCH_MAX_IDS]},
+        params={'fields': S2_PAPER_FIELDS},
+        api_key=keys['semantic_scholar_api_key'],
+        deadline=deadline
+    )
+    if response is None:
+        return papers
+
+    fetched = [paper for paper in response.json() if paper] # unknown IDs are returned as null
+    try:
+        store_paper_metadata(fetched)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error writing paper metadata cache: {str(e)}")
+
+    papers.update({paper['paperId']: paper for paper in fetched if paper.get('paperId')})
+    return papers
+
+@span('fetch_embeddings')
+def fetch_embeddings(paper_ids: list, keys: dict, deadline: Deadline) -> dict[str, bytes]:
+    """
+    Fetch SPECTER embeddings of the given papers, from the embedding cache if possible,
+    else with a single request to the Semantic Scholar batch endpoint.
+
+    Args:
+        paper_ids (list): Semantic Scholar paper IDs or 'DOI:<doi>'.
+        keys (dict): A dictionary containing the API keys.
+        deadline (Deadline): The time budget of the request.
+
+    Returns:
+        dict[str, bytes]: float32 embeddings by paper ID (papers without embedding are missing).
+    """
+
+    vectors = {}
+    try:
+        cached = PaperEmbedding.query.filter(
+            PaperEmbedding.paper_id.in_(paper_ids),
+            PaperEmbedding.fetched_at >= time.time() - PAPER_METADATA_TTL_SECONDS
+        )
+        vectors = {entry.paper_id: entry.vector for entry in cached}
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error reading embedding cache: {str(e)}")
+
+    missing = [paper_id for paper_id in paper_ids if paper_id not in vectors]
+    metrics.CACHE_LOOKUPS.inc(len(paper_ids) - len(missing), cache='embedding', result='hit')
+    metrics.CACHE_LOOKUPS.inc(len(missing), cache='embedding', result='miss')
+    if not missing:
+        return vectors
+
+    response = post_semantic_scholar(
+        S2_BATCH_URL,
+        payload={'ids': missing[:S2_BATCH_MAX_IDS]},
+        params={'fields': S2_EMBEDDING_FIELD},
+        api_key=keys['semantic_scholar_api_key'],
+        deadline=deadline
+    )
+    if response is None:
+        return vectors
+
+    # records are returned in the order of the requested IDs, unknown IDs as null
+    now = time.time()
+    try:
+        for paper_id, paper in zip(missing, response.json()):
+            embedding = (paper or {}).get('embedding') or {}
+            if embedding.get('vector'):
+                vectors[paper_id] = array('f', embedding['vector']).tobytes()
+                db.session.merge(PaperEmbedding(paper_id=paper_id, vector=vectors[paper_id], fetched_at=now))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error writing embedding cache: {str(e)}")
+
+    return vectors
+
+def select_recommendations(seed_papers: list, candidates: list, n_recommendations: int, keys: dict, deadline: Deadline) -> list:
+    """
+    Select the best candidates by relevance to the seed papers and diversity (maximal marginal relevance)
+    of their SPECTER embeddings. Falls back to the order of Semantic Scholar if re-ranking is disabled,
+    numpy isn't installed or embeddings are missing.
+
+    Args:
+        seed_papers (list[Paper]): Papers used as seed for the recommendations.
+        candidates (list[Paper]): Complete recommendations in the order returned by Semantic Scholar.
+        n_recommendations (int): Number of recommendations to select.
+        keys (dict): A dictionary containing the API keys.
+        deadline (Deadline): The time budget of the request.
+
+    Returns:
+        list[Paper]: Up to n_recommendations selected papers.
+    """
+
+    if not RERANK_RECOMMENDATIONS or len(candidates) <= n_recommendations:
+        return candidates[:n_recommendations]
+
+    try:
+        from api.rerank import mmr_select # numpy is only imported when re-ranking
+    except ImportError:
+        return candidates[:n_recommendations]
+
+    try:
+        seed_ids = [f"DOI:{paper.doi}" for paper in seed_papers if paper.doi]
+        vectors = fetch_embeddings(seed_ids + [paper.paper_id for paper in candidates if paper.paper_id], keys, deadline)
+        seed_vectors = [vectors[paper_id] for paper_id in seed_ids if paper_id in vectors]
+        ranked = [paper for paper in candidates if paper.paper_id in vectors]
+        if not seed_vectors or len(ranked) < n_recommendations:
+            logger.debug("Not enough embeddings to re-rank recommendations")
+            return candidates[:n_recommendations]
+
+        with span('rerank'):
+            selected = mmr_select(seed_vectors, [vectors[paper.paper_id] for paper in ranked], n_recommendations, diversity=RERANK_DIVERSITY)
+        return [ranked[i] for i in selected]
+
+    except Exception as e:
+        logger.error(f"Error re-ranking recommendations: {str(e)}")
+        return candidates[:n_recommendations]
+
+def fetch_candidates(seed_papers: list, n_recommendations: int, keys: dict, deadline: Deadline) -> list:
+    """
+    Fetch recommendation candidates from Semantic Scholar based on the seed papers.
+    A larger pool of candidates is requested once, and candidates missing required fields are hydrated
+    through the batch endpoint (or the paper metadata cache) instead of asking for new recommendations.
+
+    Args:
+        seed_papers (list[Paper]): Papers to use as seed for recommendations.
+        n_recommendations (int): Number of recommendations needed.
+        keys (dict): A dictionary containing the API keys.
+        deadline (Deadline): The time budget of the request.
+
+    Returns:
+        list[Paper]: The complete candidates, in the order returned by Semantic Scholar.
+    """
+
+    # prepare paper ids for recommendation
+    paper_ids = [paper.doi for paper in seed_papers if paper.doi]
+    if not paper_ids:
+        logger.debug("No DOIs found in seed papers")
+        return []
+
+    # call Semantic Scholar Recommendations API with all seed papers as positive examples
+    logger.debug("Getting recommendations for %s papers", len(paper_ids))
+    response = post_semantic_scholar(
+        S2_RECOMMENDATIONS_URL,
+        payload={'positivePaperIds': paper_ids},
+        params={
+            'fields': S2_PAPER_FIELDS,
+            'limit': n_recommendations * RECOMMENDATION_POOL_FACTOR # request more papers as buffer
+        },
+        api_key=keys['semantic_scholar_api_key'],
+        deadline=deadline
+    )
+    if response is None:
+        return []
+
+    candidates = response.json().get('recommendedPapers', [])
+    logger.debug("Received %s recommendations from Semantic Scholar", len(candidates))
+
+    # hydrate incomplete candidates, if there are not enough complete ones
+    hydrated = {}
+    if sum(is_complete_recommendation(paper) for paper in candidates) < n_recommendations:
+        incomplete_ids = [paper['paperId'] for paper in candidates if paper.get('paperId') and not is_complete_recommendation(paper)]
+        hydrated = hydrate_papers(incomplete_ids, keys, deadline)
+
+    # convert and validate the candidates
+    complete_candidates = []
+    skipped = 0
+    for paper in candidates:
+        if not is_complete_recommendation(paper):
+            paper = hydrated.get(paper.get('paperId'), paper)
+            if not is_complete_recommendation(paper):
+                continue
+
+        candidate = Paper.from_semantic_scholar(paper)
+        if candidate.published is None:
+            skipped += 1 # unparseable publication date
+            continue
+        complete_candidates.append(candidate)
+
+    if skipped:
+        logger.debug("Skipped %s recommendations with invalid publication dates", skipped)
+    return complete_candidates
+
+def library_index(library: str) -> set[str]:
+    """
+    Build the index of papers in the library mirror, to filter out recommendations the user already owns.
+
+    Args:
+        library (str): The library fingerprint.
+
+    Returns:
+        set[str]: Identities (normalized DOIs) of the papers in the library.
     """
-    Fetch the last n_papers from Zotero.
+
+    try:
+        rows = db.session.query(LibraryItem.doi).filter(LibraryItem.library == library)
+        return {doi.lower() for (doi,) in rows if doi}
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error loading library index: {str(e)}")
+        return set()
+
+def load_candidate_pool(library: str) -> list:
+    """
+    Load the newest candidates of a library that weren't recommended yet.
 
     Args:
-        n_papers (int): Number of papers to fetch.
-        keys (dict): A dictionary containing the API keys.
+        library (str): The library fingerprint.
 
     Returns:
-        list: A list of dictionaries containing the recent papers.
+        list[Paper]: The candidates, newest first (in the order returned by Semantic Scholar within a fetch).
     """
 
-    if keys is None:
-        keys = load_api_keys()
-    
-    if not keys['zotero_api_key'] or not keys['zotero_user_id']:
-        logger.debug("Missing Zotero API keys")
-        return []
-    
     try:
-        zotero_client = zotero.Zotero(keys['zotero_user_id'], 'user', keys['zotero_api_key'])
-        rate_limit() # add delay before API call
-        items = zotero_client.items(limit=n_papers, sort='dateAdded', direction='desc')
-        logger.debug(f"Fetched {len(items)} items from Zotero")
-        
-        # format the papers
-        papers = []
-        for item in items:
-            # only include papers with DOIs
-            if item['data'].get('DOI'):
-
-                date = item['data'].get('date', '')
-                if date:
-                    # parse and format the date
-                    try:
-                        date_obj = datetime.strptime(date, '%Y-%m-%d')
-                        date = date_obj.strftime('%B %d, %Y')
-                        logger.debug(f"Formatted date")
-                    # keep original date format if parsing fails
-                    except:
-                        logger.debug(f"Could not parse date: {date}")
-                        pass
-
-                paper = {
-                    'title': item['data'].get('title', ''),
-                    'authors': [creator.get('name', '') for creator in item['data'].get('creators', [])],
-                    'doi': item['data'].get('DOI', ''),
-                    'abstract': item['data'].get('abstractNote', ''),
-                    'date': date,
-                    'url': item['data'].get('url', ''),
-                    'zotero_url': f"https://www.zotero.org/groups/{keys['zotero_user_id']}/items/{item['key']}"
-                }
-                papers.append(paper)
-
-        logger.debug(f"Processed {len(papers)} papers with DOIs")
-        return papers
-    
+        rows = (CandidatePaper.query
+                .filter(CandidatePaper.library == library, CandidatePaper.shown_on.is_(None))
+                .order_by(CandidatePaper.added_at.desc(), CandidatePaper.id)
+                .limit(CANDIDATE_POOL_MAX_SIZE))
+        return [Paper.from_dict(json.loads(row.data)) for row in rows]
     except Exception as e:
-        logger.error(f"Error fetching papers from Zotero: {str(e)}")
+        db.session.rollback()
+        logger.error(f"Error loading candidate pool: {str(e)}")
         return []
 
-def get_random_seed_papers(papers: list, n_seed_papers: int = 10) -> list:
+def store_candidates(library: str, papers: list) -> None:
     """
-    Randomly select n_seed_papers from the list of papers to use as seed for recommendations.
+    Add candidates to the pool of a library. Candidates already in the pool (shown or not) are kept as they are,
+    and unshown candidates older than CANDIDATE_POOL_TTL_SECONDS are dropped.
 
     Args:
-        papers (list): List of all papers to choose from.
-        n_seed_papers (int): Number of seed papers to select.
+        library (str): The library fingerprint.
+        papers (list[Paper]): The candidates.
+    """
 
-    Returns:
-        list: A list of n_seed_papers randomly selected papers.
+    now = time.time()
+    try:
+        papers = [paper for paper in papers if paper.paper_id]
+        existing = {paper_id for (paper_id,) in db.session.query(CandidatePaper.paper_id).filter(
+            CandidatePaper.library == library,
+            CandidatePaper.paper_id.in_([paper.paper_id for paper in papers])
+        )}
+        for paper in papers:
+            if paper.paper_id not in existing:
+                existing.add(paper.paper_id)
+                db.session.add(CandidatePaper(library=library, paper_id=paper.paper_id, data=json.dumps(paper.to_dict(), separators=(',', ':')), added_at=now))
+
+        CandidatePaper.query.filter(
+            CandidatePaper.library == library,
+            CandidatePaper.shown_on.is_(None),
+            CandidatePaper.added_at < now - CANDIDATE_POOL_TTL_SECONDS
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error storing candidate pool: {str(e)}")
+
+def mark_shown(library: str, papers: list, day=None) -> None:
     """
+    Mark candidates as recommended, so they aren't recommended again.
 
-    # if less than n_seed_papers, return all papers
-    if len(papers) <= n_seed_papers:
-        return papers
-    
-    # set a fixed seed based on the current date
-    today = datetime.now().date()
-    random.seed(today.toordinal())
+    Args:
+        library (str): The library fingerprint.
+        papers (list[Paper]): The recommended papers.
+        day (date): The day of the recommendations, by default today.
+    """
 
-    seed_papers = random.sample(papers, n_seed_papers)
-    random.seed()
-    
-    return seed_papers
+    try:
+        CandidatePaper.query.filter(
+            CandidatePaper.library == library,
+            CandidatePaper.paper_id.in_([paper.paper_id for paper in papers])
+        ).update({'shown_on': day or datetime.now().date()}, synchronize_session=False)
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error marking recommendations as shown: {str(e)}")
 
-def get_paper_recommendations(seed_papers: list, n_recommendations: int = 3, keys: dict = None) -> list:
+def get_paper_recommendations(seed_papers: list, n_recommendations: int = 3, keys: dict = None, deadline: Deadline = None,
+                              library: str = None, owned: set[str] = None) -> list:
     """
-    Get paper recommendations from Semantic Scholar based on random seed papers.
-    Ensures we get exactly n_recommendations with all required fields.
+    Get paper recommendations based on random seed papers.
+    With a library, recommendations are picked from its persistent candidate pool, which collects every complete
+    candidate received and excludes those already recommended; Semantic Scholar is only called when the pool runs low.
+    Papers the user already owns are never recommended.
 
     Args:
-        seed_papers (list): List of papers to use as seed for recommendations.
+        seed_papers (list[Paper]): Papers to use as seed for recommendations.
         n_recommendations (int): Number of recommendations to get.
         keys (dict): A dictionary containing the API keys.
+        deadline (Deadline): The time budget of the request.
+        library (str): The library fingerprint, None to not use a candidate pool.
+        owned (set[str]): Identities of the papers in the library (see library_index).
 
     Returns:
-        list: A list of n_recommendations dictionaries containing the recommendations.
+        list[Paper]: Up to n_recommendations recommended papers.
     """
 
     if keys is None:
@@ -261,102 +1347,29 @@ def get_paper_recommendations(seed_papers: list, n_recommendations: int = 3, key
     if not keys['semantic_scholar_api_key'] or not seed_papers:
         logger.debug("Missing Semantic Scholar API key or no seed papers")
         return []
-    
+
+    if deadline is None:
+        deadline = Deadline(None)
+    owned = owned or set()
+
     try:
-        # prepare paper ids for recommendation
-        paper_ids = []
-        for paper in seed_papers:
-            if paper.get('doi'):
-                paper_ids.append(paper['doi'])
-                logger.debug("Added DOI for recommendation")
-            else:
-                logger.debug(f"Paper has no DOI: {paper['title']}")
-        
-        if not paper_ids:
-            logger.debug("No DOIs found in seed papers")
-            return []
-        
-        # attempt to get n_recommendations with all fields
-        max_attempts = 5 
-        complete_recommendations = []
-        
-        for attempt in range(max_attempts):
-            if len(complete_recommendations) >= n_recommendations:
-                break
-                
-            # call Semantic Scholar Recommendations API with all seed papers as positive examples
-            url = "https://api.semanticscholar.org/recommendations/v1/papers"
-            headers = {
-                'x-api-key': keys['semantic_scholar_api_key'],
-                'Content-Type': 'application/json'
-            }
-            payload = {
-                'positivePaperIds': paper_ids
-            }
-            
-            logger.debug(f"Getting recommendations for {len(paper_ids)} papers (attempt {attempt + 1})")
-            rate_limit() # add delay before API call
-            response = requests.post(
-                url,
-                headers=headers,
-                json=payload,
-                params={
-                    'fields': 'title,authors,url,publicationDate,abstract',
-                    'limit': n_recommendations * 3 # request more papers as buffer
-                }
-            )
-            
-            if response.status_code == 200:
-                recommendations = response.json().get('recommendedPapers', [])
-                logger.debug(f"Received {len(recommendations)} recommendations from Semantic Scholar")
-                
-                # format and validate the recommendations
-                for paper in recommendations:
-                    
-                    # stop if we have enough recommendations
-                    if len(complete_recommendations) >= n_recommendations:
-                        break
-                        
-                    # check if all required fields are present and non-empty
-                    if not all([
-                        paper.get('title'),
-                        paper.get('authors'),
-                        paper.get('publicationDate'),
-                        paper.get('abstract')
-                    ]):
-                        logger.debug("Skipping incomplete recommendation")
-                        continue
-
-                    # format the date
-                    date = paper.get('publicationDate', '')
-                    try:
-                        date_obj = datetime.strptime(date, '%Y-%m-%d')
-                        date = date_obj.strftime('%B %d, %Y')
-                        logger.debug("Formatted recommendation date")
-                    except:
-                        logger.debug(f"Could not parse recommendation date: {date}")
-                        continue
-                    
-                    # format the recommendation
-                    formatted_paper = {
-                        'title': paper.get('title', ''),
-                        'authors': [author.get('name', '') for author in paper.get('authors', [])],
-                        'url': paper.get('url', ''),
-                        'date': date,
-                        'abstract': paper.get('abstract', '')
-                    }
-                    complete_recommendations.append(formatted_paper)
-                    logger.debug("Added complete recommendation")
-            
-            # if error, log and return on last attempt
+        candidates = [paper for paper in load_candidate_pool(library) if paper.identity not in owned] if library else []
+        if len(candidates) < n_recommendations * CANDIDATE_POOL_MIN_FACTOR:
+            fetched = fetch_candidates(seed_papers, n_recommendations, keys, deadline)
+            if library:
+                store_candidates(library, fetched)
+                candidates = [paper for paper in load_candidate_pool(library) if paper.identity not in owned]
             else:
-                logger.error(f"Semantic Scholar API error: {response.status_code} - {response.text}")
-                if attempt == max_attempts - 1:
-                    return complete_recommendations
+                candidates = [paper for paper in fetched if paper.identity not in owned]
+        else:
+            logger.debug("Picking recommendations from candidate pool of %s papers", len(candidates))
+
+        recommendations = select_recommendations(seed_papers, candidates, n_recommendations, keys, deadline)
+        if library:
+            mark_shown(library, recommendations)
+        logger.debug("Selected %s of %s candidates", len(recommendations), len(candidates))
+        return recommendations
 
-        logger.debug(f"Final complete recommendations count: {len(complete_recommendations)} (will return first {n_recommendations})")
-        return complete_recommendations[:n_recommendations]
-        
     except Exception as e:
         logger.error(f"Error getting recommendations: {str(e)}")
         return []
@@ -377,16 +1390,317 @@ def should_update_recommendations() -> bool:
     # check if last refresh date is before today
     try:
         last_refresh_date = datetime.strptime(last_refresh, '%Y-%m-%d').date()
-        logger.debug(f"Last refresh date: {last_refresh_date}")
+        logger.debug("Last refresh date: %s", last_refresh_date)
         return last_refresh_date < datetime.now().date()
     
     except Exception as e:
         logger.error(f"Error checking last refresh date: {str(e)}")
         return True
 
+def encode_payload(data: dict) -> bytes:
+    """
+    Serialize data to compact, compressed JSON for storage.
+
+    Args:
+        data (dict): The data to serialize.
+
+    Returns:
+        bytes: The serialized data.
+    """
+
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode())
+
+def decode_payload(payload: bytes) -> dict:
+    """
+    Deserialize data stored with encode_payload.
+
+    Args:
+        payload (bytes): The serialized data.
+
+    Returns:
+        dict: The data.
+    """
+
+    return json.loads(zlib.decompress(payload))
+
+def load_daily_recommendation(account: str, library: str = None, day=None, recommendation_id: int = None, strategy: str = SEED_STRATEGY) -> dict | None:
+    """
+    Load stored seed papers and recommendations, by account and day or by ID (as referenced in the session).
+    Results of another account (e.g. the previous user of the session), of another seed strategy,
+    or stored before a notified library change are ignored.
+
+    Args:
+        account (str): The account fingerprint.
+        library (str): The library fingerprint, to check for library changes.
+        day (date): The day of the recommendations, by default today.
+        recommendation_id (int): The ID of the stored recommendations.
+        strategy (str): The seed strategy of the recommendations.
+
+    Returns:
+        dict | None: The stored 'seed_papers' and 'recommendations', None if there are none.
+    """
+
+    day = day or datetime.now().date()
+    try:
+        if recommendation_id is not None:
+            entry = db.session.get(DailyRecommendation, recommendation_id)
+        else:
+            entry = DailyRecommendation.query.filter_by(account=account, day=day).first()
+
+        if entry is None or entry.day != day or entry.account != account:
+            return None
+
+        if library and library_changed_since(library, entry.created_at):
+            logger.debug("Library changed since the recommendations were stored")
+            return None
+
+        payload = decode_payload(entry.payload)
+        if payload.pop('strategy', strategy) != strategy: # stored before strategies were recorded
+            return None
+        return {name: [Paper.from_dict(paper) for paper in papers] for name, papers in payload.items()}
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error loading daily recommendations: {str(e)}")
+        return None
+
+def store_daily_recommendation(account: str, results: dict, day=None, strategy: str = SEED_STRATEGY) -> DailyRecommendation | None:
+    """
+    Store seed papers and recommendations of an account for a day.
+
+    Args:
+        account (str): The account fingerprint.
+        results (dict): The 'seed_papers' and 'recommendations' (lists of Paper) to store.
+        day (date): The day of the recommendations, by default today.
+        strategy (str): The seed strategy of the recommendations.
+
+    Returns:
+        DailyRecommendation | None: The stored entry, None on error.
+    """
+
+    day = day or datetime.now().date()
+    try:
+        entry = DailyRecommendation.query.filter_by(account=account, day=day).first()
+        if entry is None:
+            entry = DailyRecommendation(account=account, day=day)
+            db.session.add(entry)
+
+        entry.payload = encode_payload({
+            'strategy': strategy,
+            **{name: [paper.to_dict() for paper in papers] for name, papers in results.items()}
+        })
+        entry.created_at = time.time()
+        db.session.commit()
+        logger.debug("Stored daily recommendations (%s bytes)", len(entry.payload))
+        return entry
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error storing daily recommendations: {str(e)}")
+        return None
+
+def load_last_recommendations(account: str, day=None) -> tuple[list, object]:
+    """
+    Load the most recent stored recommendations of an account, to serve while new ones can't be generated.
+
+    Args:
+        account (str): The account fingerprint.
+        day (date): The latest day to consider, by default today.
+
+    Returns:
+        tuple[list[Paper], date | None]: The recommendations and their day, ([], None) if there are none.
+    """
+
+    day = day or datetime.now().date()
+    try:
+        entries = (DailyRecommendation.query
+                   .filter(DailyRecommendation.account == account,
+                           DailyRecommendation.day <= day,
+                           DailyRecommendation.day > day - timedelta(days=LAST_GOOD_LOOKBACK_DAYS))
+                   .order_by(DailyRecommendation.day.desc()))
+        for entry in entries:
+            recommendations = decode_payload(entry.payload).get('recommendations')
+            if recommendations:
+                return [Paper.from_dict(paper) for paper in recommendations], entry.day
+        return [], None
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error loading last recommendations: {str(e)}")
+        return [], None
+
+class RecommendationPipeline:
+    """
+    Lazily evaluated recommendation stages: library -> seed papers -> recommendations.
+    Each stage only runs when its output is needed and no memoized value (e.g. today's results from the session) is available.
+    If no recommendations can be generated (e.g. during an upstream outage), the last good ones are served as stale
+    and nothing is stored, so the next request tries again.
+    """
+
+    def __init__(self, keys: dict, n_seed_papers: int = 10, n_recommendations: int = 3, deadline: Deadline = None, memo: dict = None):
+        """
+        Args:
+            keys (dict): A dictionary containing the API keys.
+            n_seed_papers (int): Number of seed papers to select.
+            n_recommendations (int): Number of recommendations to get.
+            deadline (Deadline): The time budget of the request, by default REQUEST_DEADLINE_SECONDS from now.
+            memo (dict): Today's memoized 'seed_papers' and 'recommendations', by default loaded from the database.
+        """
+
+        self.keys = keys
+        self.n_seed_papers = n_seed_papers
+        self.n_recommendations = n_recommendations
+        self.deadline = deadline or Deadline(REQUEST_DEADLINE_SECONDS)
+        self.library_id = library_fingerprint(keys['zotero_user_id']) if keys.get('zotero_user_id') else None
+        self.account_id = account_fingerprint(keys) if self.library_id else None # stored results are only served to the same keys
+        if memo is None and self.library_id:
+            memo = load_daily_recommendation(self.account_id, self.library_id)
+        self.memo = {name: value for name, value in (memo or {}).items() if value}
+        self.changed = False
+        self.stale = False # recommendations aren't newly generated today (the last good ones, or none)
+        self.updated_on = datetime.now().date() # day of the recommendations
+
+    @cached_property
+    def library(self) -> str | None:
+        # the synced library mirror, None if there is none or it may not be served to the keys
+        if not self.library_id or not self.keys.get('zotero_api_key'):
+            return None
+        return refresh_library_mirror(self.keys, self.deadline, full=True)
+
+    @cached_property
+    def seed_papers(self) -> list:
+        if 'seed_papers' in self.memo:
+            return self.memo['seed_papers']
+
+        logger.debug("Selecting seed papers")
+        self.changed = True
+        if self.library is None:
+            return []
+        seed_keys = get_random_seed_papers(load_seed_index(self.library), n_seed_papers=self.n_seed_papers, library=self.library)
+        return load_library_papers(self.library, seed_keys, self.keys['zotero_user_id'])
+
+    @cached_property
+    def owned(self) -> set[str]:
+        # identities of the papers in the library
+        return library_index(self.library_id) if self.library_id else set()
+
+    @cached_property
+    def recommendations(self) -> list:
+        if 'recommendations' in self.memo:
+            return self.memo['recommendations']
+
+        logger.debug("Updating recommendations")
+        self.changed = True
+        if not self.library_id:
+            recommendations = get_paper_recommendations(self.seed_papers, n_recommendations=self.n_recommendations, keys=self.keys, deadline=self.deadline, owned=self.owned)
+            self.stale = not recommendations
+            return recommendations
+
+        # coalesce concurrent updates for the same user and day
+        def generate() -> list:
+            recommendations = get_paper_recommendations(self.seed_papers, n_recommendations=self.n_recommendations, keys=self.keys, deadline=self.deadline,
+                                                        library=self.library_id, owned=self.owned)
+            if recommendations: # never replace stored recommendations with none
+                store_daily_recommendation(self.account_id, {**self.results(), 'recommendations': recommendations})
+            return recommendations
+
+        def lookup() -> list | None:
+            return (load_daily_recommendation(self.account_id, self.library_id) or {}).get('recommendations') or None
+
+        key = f"recommendations:{self.account_id}:{datetime.now().date().isoformat()}:{SEED_STRATEGY}"
+        recommendations = single_flight.run(key, generate, lookup, timeout=self.deadline.remaining() / 2)
+        if recommendations:
+            return recommendations
+
+        self.stale = True
+        recommendations, day = load_last_recommendations(self.account_id)
+        if recommendations:
+            logger.warning(f"No new recommendations, serving the last good ones from {day}")
+            self.updated_on = day
+        return recommendations
+
+    def results(self) -> dict:
+        """
+        Returns:
+            dict: The memoized and evaluated stage outputs ('seed_papers', 'recommendations').
+        """
+
+        results = dict(self.memo)
+        for name in ('seed_papers', 'recommendations'):
+            if name in self.__dict__:
+                results[name] = self.__dict__[name]
+        return results
+
+    def save(self) -> DailyRecommendation | None:
+        """
+        Store today's results in the database, if any stage was (re-)evaluated and the recommendations aren't stale.
+
+        Returns:
+            DailyRecommendation | None: The stored entry, None if nothing was stored.
+        """
+
+        if not self.changed or not self.library_id or self.stale:
+            return None
+
+        entry = store_daily_recommendation(self.account_id, self.results())
+        if entry is not None:
+            self.changed = False
+        return entry
+
+def get_pipeline(n_seed_papers: int = 10, n_recommendations: int = 3) -> RecommendationPipeline:
+    """
+    Get the recommendation pipeline of the current request, shared by everything rendering it.
+    Today's stored results referenced by the session are used as memo.
+
+    Args:
+        n_seed_papers (int): Number of seed papers to select.
+        n_recommendations (int): Number of recommendations to get.
+
+    Returns:
+        RecommendationPipeline: The pipeline.
+    """
+
+    pipeline = g.get('recommendation_pipeline')
+    if pipeline is None:
+        keys = load_api_keys()
+        memo = None
+        recommendation_id = session.get('daily_recommendation')
+        if recommendation_id and keys['zotero_user_id'] and not should_update_recommendations():
+            logger.debug("Recommendations are up to date, using stored recommendations")
+            memo = load_daily_recommendation(account_fingerprint(keys), library_fingerprint(keys['zotero_user_id']), recommendation_id=recommendation_id)
+
+        pipeline = g.recommendation_pipeline = RecommendationPipeline(keys, n_seed_papers, n_recommendations, memo=memo)
+    return pipeline
+
+def save_pipeline(pipeline: RecommendationPipeline) -> None:
+    """
+    Save the results of a pipeline to the database, if any stage was (re-)evaluated,
+    and keep only a reference to them in the session.
+
+    Args:
+        pipeline (RecommendationPipeline): The pipeline.
+    """
+
+    entry = pipeline.save()
+    if entry is None:
+        return
+
+    try:
+        session['last_refresh'] = entry.day.strftime('%Y-%m-%d')
+        session['daily_recommendation'] = entry.id
+
+        # drop data stored in the session by earlier versions
+        session.pop('seed_papers', None)
+        session.pop('recommendations', None)
+        logger.debug("Saved reference to daily recommendations to session")
+
+    except Exception as e:
+        logger.error(f"Error saving data to session: {str(e)}")
+
 def update_recommendations(n_seed_papers: int = 10, n_recommendations: int = 3) -> tuple[list, list, str]:
     """
     Update recommendations if needed.
+    Stages are evaluated lazily, so up-to-date session data is returned without any upstream calls.
 
     Args:
         n_seed_papers (int): Number of seed papers to select.
@@ -396,59 +1710,11 @@ def update_recommendations(n_seed_papers: int = 10, n_recommendations: int = 3)
         tuple[list, list, str]: A tuple containing (seed_papers, recommendations, last_update_date)
     """
     
-    all_papers = fetch_recent_papers(n_papers=n_seed_papers*10)
-    seed_papers = []
-    recommendations = []
-    last_update_date = None
-    
-    # update recommendations, if needed
-    if should_update_recommendations():
-        logger.debug("Updating recommendations")
-        seed_papers = get_random_seed_papers(all_papers, n_seed_papers=n_seed_papers)
-        recommendations = get_paper_recommendations(seed_papers, n_recommendations=n_recommendations)
-        
-        try:
-            current_date = datetime.now().date().strftime('%Y-%m-%d')
-            
-            # save to session
-            session['last_refresh'] = current_date
-            session['seed_papers'] = seed_papers
-            session['recommendations'] = recommendations
-            logger.debug(f"Saved {len(seed_papers)} seed papers and {len(recommendations)} recommendations to session")
-            
-            last_update_date = current_date
-        
-        except Exception as e:
-            logger.error(f"Error saving data to session: {str(e)}")
-    
-    # load existing recommendations from session, if available
-    else:
-        logger.debug("Recommendations are up to date, loading from session")
-
-        seed_papers = session.get('seed_papers', [])
-        recommendations = session.get('recommendations', [])
-        last_update_date = session.get('last_refresh')
-        logger.debug(f"Loaded {len(seed_papers)} seed papers and {len(recommendations)} recommendations from session")
-        
-        # if session data is empty, generate new recommendations
-        if not seed_papers or not recommendations:
-            logger.debug("Session data is empty, generating new recommendations")
-            seed_papers = get_random_seed_papers(all_papers, n_seed_papers=n_seed_papers)
-            recommendations = get_paper_recommendations(seed_papers, n_recommendations=n_recommendations)
-            
-            try:
-                current_date = datetime.now().date().strftime('%Y-%m-%d')
-
-                # save to session
-                session['last_refresh'] = current_date
-                session['seed_papers'] = seed_papers
-                session['recommendations'] = recommendations
-                logger.debug(f"Saved {len(seed_papers)} seed papers and {len(recommendations)} recommendations to session")
-
-                last_update_date = current_date
-                
-            except Exception as e:
-                logger.error(f"Error saving data to session: {str(e)}")
+    pipeline = get_pipeline(n_seed_papers=n_seed_papers, n_recommendations=n_recommendations)
+    seed_papers = pipeline.seed_papers
+    recommendations = pipeline.recommendations
+    save_pipeline(pipeline)
+    last_update_date = pipeline.updated_on.strftime('%Y-%m-%d') # memoized results are always today's
     
     # ensure we have valid data before returning
     if not seed_papers or not recommendations:
@@ -472,12 +1738,12 @@ def register():
         
         if User.query.filter_by(username=username).first():
             flash('Username already exists')
-            logger.debug(f"Username {username} already exists")
+            logger.debug("Username %s already exists", username)
             return redirect(url_for('register'))
             
         if User.query.filter_by(email=email).first():
             flash('Email already registered')
-            logger.debug(f"Email {email} already registered")
+            logger.debug("Email %s already registered", email)
             return redirect(url_for('register'))
         
         user = User(username=username, email=email)
@@ -487,7 +1753,7 @@ def register():
         db.session.commit()
         
         flash('Registration successful! Please login.')
-        logger.debug(f"Registration successful for {username}")
+        logger.debug("Registration successful for %s", username)
         return redirect(url_for('login'))
         
     return render_template('register.html')
@@ -508,16 +1774,16 @@ def login():
         if user and user.check_password(password):
             login_user(user)
             flash('Logged in successfully!')
-            logger.debug(f"Login successful for {username}")
+            logger.debug("Login successful for %s", username)
 
             next_page = request.args.get('next')
             if not next_page or not next_page.startswith('/'):
                 next_page = url_for('index')
-            logger.debug(f"Redirecting to {next_page}")
+            logger.debug("Redirecting to %s", next_page)
             return redirect(next_page)
             
         flash('Invalid username or password')
-        logger.debug(f"Login failed for {username}")
+        logger.debug("Login failed for %s", username)
         return redirect(url_for('login'))
         
     return render_template('login.html')
@@ -531,8 +1797,12 @@ def logout():
 
     username = current_user.username
     logout_user()
+
+    # stored recommendations belong to the user, not the browser
+    session.pop('daily_recommendation', None)
+    session.pop('last_refresh', None)
     flash('Logged out successfully!')
-    logger.debug(f"Logged out user {username}")
+    logger.debug("Logged out user %s", username)
     return redirect(url_for('index'))
 
 @app.route('/')
@@ -547,7 +1817,7 @@ def index():
         
     keys = load_api_keys()
     seed_papers, recommendations, last_update_date = update_recommendations(n_seed_papers=10, n_recommendations=3)
-    logger.debug(f"Rendering index with {len(seed_papers)} seed papers and {len(recommendations)} recommendations")
+    logger.debug("Rendering index with %s seed papers and %s recommendations", len(seed_papers), len(recommendations))
     
     auth = request.authorization
     is_admin = auth and verify_admin(auth.username, auth.password)
@@ -576,7 +1846,7 @@ def manage_keys():
         }
         save_api_keys(keys)
         flash('API keys saved successfully!')
-        logger.debug(f"API keys saved successfully for {current_user.username}")
+        logger.debug("API keys saved successfully for %s", current_user.username)
         return redirect(url_for('index'))
     
     keys = load_api_keys()
@@ -591,9 +1861,12 @@ def get_papers() -> json:
         json: A JSON object containing the seed papers.
     """
 
-    seed_papers, _, _ = update_recommendations()
-    logger.debug(f"API /papers returning {len(seed_papers)} papers")
-    return jsonify(seed_papers)
+    # only the seed papers are needed, recommendations aren't requested
+    pipeline = get_pipeline()
+    seed_papers = pipeline.seed_papers
+    save_pipeline(pipeline)
+    logger.debug("API /papers returning %s papers", len(seed_papers))
+    return jsonify([paper.to_json() for paper in seed_papers])
 
 @app.route('/api/recommendations')
 def get_recommendations() -> json:
@@ -605,44 +1878,71 @@ def get_recommendations() -> json:
     """
     
     _, recommendations, _ = update_recommendations()
-    logger.debug(f"API /recommendations returning {len(recommendations)} recommendations")
-    return jsonify(recommendations)
+    logger.debug("API /recommendations returning %s recommendations", len(recommendations))
+    response = jsonify([paper.to_json() for paper in recommendations])
+    if get_pipeline().stale:
+        response.headers['Warning'] = STALE_WARNING
+    return response
+
+@span('generate_feed')
+def generate_feed(keys: dict, link: str, deadline: Deadline = None, format: str = 'rss') -> tuple[bytes, bool]:
+    """
+    Generate the feed of paper recommendations.
 
-@app.route('/feed.xml')
-def rss_feed() -> Response:
+    Args:
+        keys (dict): A dictionary containing the API keys.
+        link (str): The URL the feed links to.
+        deadline (Deadline): The time budget of the request, by default REQUEST_DEADLINE_SECONDS from now.
+        format (str): The feed format ('rss', 'atom' or 'json').
+
+    Returns:
+        tuple[bytes, bool]: The feed, and whether its recommendations are stale (the last good ones, or none).
+    """
+
+    logger.debug("Generating new %s feed", format)
+    pipeline = RecommendationPipeline(keys, n_seed_papers=10, n_recommendations=3, deadline=deadline)
+    recommendations = pipeline.recommendations
+    pipeline.save()
+    return render_feed(recommendations, link, format), pipeline.stale
+
+@span('render_feed')
+def render_feed(recommendations: list[Paper], link: str, format: str = 'rss') -> bytes:
     """
-    Generate RSS feed of paper recommendations.
+    Render the feed of the given recommendations.
+
+    Args:
+        recommendations (list[Paper]): The recommendations to include.
+        link (str): The URL the feed links to.
+        format (str): The feed format ('rss', 'atom' or 'json').
 
     Returns:
-        Response: 503 Service Unavailable response.
+        bytes: The feed.
     """
 
-    # build cache key from encrypted URL parameters (user-specific)
-    enc_z_uid = request.args.get('zotero_user_id', '')
-    enc_z_key = request.args.get('zotero_api_key', '')
-    enc_s_key = request.args.get('semantic_scholar_api_key', '')
-    cache_key = f"{enc_z_uid}|{enc_z_key}|{enc_s_key}"
+    if format == 'rss' and FEED_RENDERER == 'feedgen':
+        return render_feed_feedgen(recommendations, link)
+    return serialize_feed(recommendations, link, format)
+
+def render_feed_feedgen(recommendations: list[Paper], link: str) -> bytes:
+    """
+    Render the RSS feed XML of the given recommendations with feedgen (reference implementation).
+
+    Args:
+        recommendations (list[Paper]): The recommendations to include.
+        link (str): The URL the feed links to.
+
+    Returns:
+        bytes: The RSS feed XML.
+    """
+
+    from feedgen.feed import FeedGenerator
 
-    keys = load_api_keys_from_url()
-    
-    now = datetime.now(timezone.utc)
-    cached = feed_cache.get(cache_key)
-    if cached:
-        age_seconds = (now - cached["timestamp"]).total_seconds()
-        if age_seconds < FEED_CACHE_TTL_SECONDS:
-            logger.debug(f"Serving cached RSS feed from in-memory cache, age {age_seconds:.0f}s")
-            return Response(cached["xml"], mimetype='application/rss+xml')
-
-    logger.debug("Generating new RSS feed")
-    papers = fetch_recent_papers(n_papers=100, keys=keys)
-    seed_papers = get_random_seed_papers(papers, n_seed_papers=10)
-    recommendations = get_paper_recommendations(seed_papers, n_recommendations=3, keys=keys)
     last_update_date = datetime.now().date().strftime('%Y-%m-%d')
 
     fg = FeedGenerator()
     fg.title('Paper Recommendations')
     fg.description('Latest paper recommendations based on your Zotero library')
-    fg.link(href=request.url_root)
+    fg.link(href=link)
     fg.language('en')
     
     if last_update_date:
@@ -652,25 +1952,229 @@ def rss_feed() -> Response:
     
     for paper in recommendations:
         fe = fg.add_entry()
-        fe.title(paper['title'])
-        fe.link(href=paper['url'])
-        fe.description(paper['abstract'])
-        fe.author(name=', '.join(paper['authors']))
-        if paper['date']:
-            try:
-                pub_date = datetime.strptime(paper['date'], '%B %d, %Y')
-                pub_date = pub_date.replace(tzinfo=timezone.utc)
-                fe.published(pub_date)
-            except:
-                pass
-
-    rss_xml = fg.rss_str(pretty=True)
-
-    # store in cache
-    feed_cache[cache_key] = {"xml": rss_xml, "timestamp": now}
-    logger.debug("Cached RSS feed in in-memory cache")
-            
-    return Response(rss_xml, mimetype='application/rss+xml')
+        fe.title(paper.title)
+        fe.link(href=paper.url)
+        fe.description(paper.abstract)
+        fe.author(name=', '.join(paper.authors))
+        if paper.published:
+            fe.published(datetime.combine(paper.published, datetime.min.time(), tzinfo=timezone.utc))
+
+    return fg.rss_str(pretty=True)
+
+def pack_feed(rss_xml: bytes, stale: bool = False, library: str = None) -> bytes:
+    """
+    Pack the feed XML for the cache, together with its content hash and precompressed copies.
+
+    Args:
+        rss_xml (bytes): The RSS feed XML.
+        stale (bool): Whether the recommendations of the feed are stale.
+        library (str): The library fingerprint of the feed, to check for library changes (see is_fresh_feed).
+
+    Returns:
+        bytes: A JSON header line followed by the bodies of all encodings.
+    """
+
+    bodies = {'identity': rss_xml, 'gzip': gzip.compress(rss_xml, mtime=0)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(rss_xml)
+
+    header = {
+        'etag': hashlib.sha256(rss_xml).hexdigest()[:32],
+        'sizes': {encoding: len(body) for encoding, body in bodies.items()}
+    }
+    if stale:
+        header['stale'] = True
+    if library:
+        header['library'] = library
+    return json.dumps(header).encode() + b'\n' + b''.join(bodies.values())
+
+def unpack_feed(packed: bytes) -> tuple[str, dict[str, bytes], bool]:
+    """
+    Unpack a feed packed with pack_feed.
+
+    Args:
+        packed (bytes): The packed feed.
+
+    Returns:
+        tuple[str, dict[str, bytes], bool]: The content hash, the bodies by content encoding and whether the feed is stale.
+    """
+
+    # entries cached before feeds were packed contain the plain XML
+    if not packed.startswith(b'{'):
+        packed = pack_feed(packed)
+
+    header, _, data = packed.partition(b'\n')
+    header = json.loads(header)
+
+    bodies = {}
+    offset = 0
+    for encoding, size in header['sizes'].items():
+        bodies[encoding] = data[offset:offset + size]
+        offset += size
+    return header['etag'], bodies, header.get('stale', False)
+
+def feed_response(packed: bytes, created_at: float = None, mimetype: str = 'application/rss+xml', stale: bool = False) -> Response:
+    """
+    Build the response for a packed feed, honoring conditional requests (If-None-Match / If-Modified-Since)
+    and sending the best precompressed body the client accepts.
+    Stale feeds are marked with a Warning header and only cached briefly by clients.
+
+    Args:
+        packed (bytes): The packed feed.
+        created_at (float): Unix timestamp the feed was generated at, by default now.
+        mimetype (str): The content type of the feed.
+        stale (bool): Whether the feed is stale (in addition to feeds packed as stale).
+
+    Returns:
+        Response: The feed response, or 304 Not Modified.
+    """
+
+    etag, bodies, packed_stale = unpack_feed(packed)
+    stale = stale or packed_stale
+    last_modified = datetime.fromtimestamp(created_at or time.time(), timezone.utc).replace(microsecond=0)
+
+    # fresh until the cache entry expires or recommendations are refreshed the next day
+    now = datetime.now(timezone.utc)
+    next_refresh = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time()).astimezone(timezone.utc)
+    max_age = min((last_modified - now).total_seconds() + FEED_CACHE_TTL_SECONDS, (next_refresh - now).total_seconds())
+
+    if request.if_none_match.contains_weak(etag) or (
+        not request.if_none_match and request.if_modified_since and request.if_modified_since >= last_modified
+    ):
+        response = Response(status=304)
+    else:
+        encoding = next((encoding for encoding in ('br', 'gzip') if encoding in bodies and encoding in request.accept_encodings), 'identity')
+        response = Response(bodies[encoding], mimetype=mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etag, weak=True) # shared by all encodings
+    response.last_modified = last_modified
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    if stale:
+        response.headers['Warning'] = STALE_WARNING
+        max_age = min(max_age, STALE_FEED_MAX_AGE_SECONDS)
+    else:
+        response.cache_control.stale_while_revalidate = FEED_CACHE_STALE_SECONDS
+    response.cache_control.max_age = max(0, int(max_age))
+    return response
+
+def feed_cache_key(account: str, format: str = 'rss') -> str:
+    return f"feed:{account}" + ('' if format == 'rss' else f":{format}")
+
+def is_fresh_feed(cached: CachedValue) -> bool:
+    """
+    Check if a cached feed is fresh. If changes are notified, feeds are kept until the recommendations of the day
+    are replaced (by the next day, or a change of the library recorded in the packed feed) instead of expiring.
+
+    Args:
+        cached (CachedValue): The cached feed.
+
+    Returns:
+        bool: True if the feed is fresh.
+    """
+
+    if not cached.fresh:
+        return False
+    if not LIBRARY_NOTIFICATIONS:
+        return True
+
+    today = datetime.combine(datetime.now().date(), datetime.min.time()).timestamp()
+    if cached.created_at < today:
+        return False
+    library = json.loads(cached.value.partition(b'\n')[0]).get('library') if cached.value.startswith(b'{') else None
+    return library is None or not library_changed_since(library, cached.created_at)
+
+def regenerate_feed(cache_key: str, keys: dict, link: str, deadline: Deadline = None, stale: bytes = None, format: str = 'rss') -> bytes:
+    """
+    Generate the RSS feed and store it in the cache, packed with its content hash and compressed copies.
+    Concurrent regenerations of the same feed are coalesced, so only one caller calls the upstream APIs.
+    Feeds with stale (or no) recommendations are never cached, and the stale cached feed is kept and returned instead.
+
+    Args:
+        cache_key (str): The cache key of the feed.
+        keys (dict): A dictionary containing the API keys.
+        link (str): The URL the feed links to.
+        deadline (Deadline): The time budget of the request.
+        stale (bytes): Stale packed feed to return if another caller is already regenerating it.
+        format (str): The feed format ('rss', 'atom' or 'json').
+
+    Returns:
+        bytes: The packed feed.
+    """
+
+    def generate() -> bytes:
+        feed, feed_stale = generate_feed(keys, link, deadline, format)
+        if feed_stale:
+            logger.warning("No new recommendations, not caching the feed")
+            return stale if stale is not None else pack_feed(feed, stale=True)
+
+        packed = pack_feed(feed, library=library_fingerprint(keys['zotero_user_id']))
+        feed_cache.set(cache_key, packed)
+        logger.debug("Cached RSS feed")
+        return packed
+
+    def lookup() -> bytes | None:
+        cached = feed_cache.get(cache_key)
+        return cached.value if cached and is_fresh_feed(cached) else None
+
+    timeout = deadline.remaining() / 2 if deadline else REQUEST_DEADLINE_SECONDS
+    return single_flight.run(cache_key, generate, lookup, stale=stale, timeout=timeout)
+
+@app.route('/feed.xml')
+def rss_feed() -> Response:
+    """
+    Generate RSS feed of paper recommendations (or an Atom or JSON feed, selected by the format parameter).
+    Fresh feeds are served from the cache, stale feeds are served while they are regenerated in the background.
+    Feed URLs carry a token (the account fingerprint, which requires the API keys), so cache hits are answered
+    without decrypting the API keys.
+    Responses support conditional requests and precompressed bodies.
+
+    Returns:
+        Response: The feed.
+    """
+
+    deadline = Deadline(REQUEST_DEADLINE_SECONDS)
+    format = request.args.get('format', 'rss')
+    if format not in FEED_FORMATS:
+        return Response(f"Unsupported feed format: {format}", status=400, mimetype='text/plain')
+    mimetype = FEED_FORMATS[format]
+
+    # look up the cache by feed token before decrypting any parameters
+    token = request.args.get('feed', '')
+    cached = feed_cache.get(feed_cache_key(token, format)) if token else None
+    if cached and is_fresh_feed(cached):
+        logger.debug("Serving cached feed, age %.0fs", cached.age)
+        metrics.CACHE_LOOKUPS.inc(cache='feed', result='hit')
+        return feed_response(cached.value, cached.created_at, mimetype)
+
+    keys = load_api_keys_from_url()
+    link = request.url_root
+
+    # without a Zotero user ID there is no feed to cache
+    if not keys['zotero_user_id']:
+        feed, _ = generate_feed(keys, link, deadline, format)
+        return Response(feed, mimetype=mimetype)
+
+    # canonical cache key shared by all feed URLs of the account
+    account = account_fingerprint(keys)
+    cache_key = feed_cache_key(account, format)
+    if not hmac.compare_digest(token.encode(), account.encode()): # the token is user input, possibly not ASCII
+        cached = feed_cache.get(cache_key)
+
+    if cached:
+        fresh = is_fresh_feed(cached)
+        metrics.CACHE_LOOKUPS.inc(cache='feed', result='hit' if fresh else 'stale')
+        if not fresh:
+            logger.debug("Serving stale feed, age %.0fs, regenerating in background", cached.age)
+            feed_cache.revalidate(cache_key, lambda: regenerate_feed(cache_key, keys, link, stale=cached.value, format=format))
+        else:
+            logger.debug("Serving cached feed, age %.0fs", cached.age)
+        return feed_response(cached.value, cached.created_at, mimetype, stale=not fresh)
+
+    metrics.CACHE_LOOKUPS.inc(cache='feed', result='miss')
+    return feed_response(regenerate_feed(cache_key, keys, link, deadline, format=format), mimetype=mimetype)
 
 @app.route('/build-feed', methods=['GET', 'POST'])
 def build_feed():
@@ -682,15 +2186,8 @@ def build_feed():
     encoded = None
     feed_url = None
 
-    default_keys = {'zotero_user_id': '', 'zotero_api_key': '', 'semantic_scholar_api_key': ''}
-
     # pre-fill form fields if user is logged in
-    if current_user.is_authenticated:
-        default_keys = {
-            'zotero_user_id': current_user.get_zotero_user_id() or '',
-            'zotero_api_key': current_user.get_zotero_api_key() or '',
-            'semantic_scholar_api_key': current_user.get_semantic_scholar_api_key() or ''
-        }
+    default_keys = load_api_keys()
     
     if request.method == 'POST':
 
@@ -709,8 +2206,24 @@ def build_feed():
             return redirect(url_for('build_feed'))
         
         encoded = {k: urllib.parse.quote(v) for k, v in encrypted.items()}
-        feed_url = (request.url_root.rstrip('/') + '/feed.xml?zotero_user_id=' + encoded['zotero_user_id'] +
+        token = account_fingerprint({'zotero_user_id': z_uid, 'zotero_api_key': z_key, 'semantic_scholar_api_key': s2_key}) if z_uid else ''
+        feed_url = (request.url_root.rstrip('/') + '/feed.xml?feed=' + token +
+                    '&zotero_user_id=' + encoded['zotero_user_id'] +
                     '&zotero_api_key=' + encoded['zotero_api_key'] +
                     '&semantic_scholar_api_key=' + encoded['semantic_scholar_api_key'])
         
-    return render_template('build_feed.html', encrypted=encrypted, encoded=encoded, feed_url=feed_url, default_keys=default_keys)
\ No newline at end of file
+    return render_template('build_feed.html', encrypted=encrypted, encoded=encoded, feed_url=feed_url, default_keys=default_keys)
+
+@app.route('/metrics')
+def metrics_endpoint() -> Response:
+    """
+    Expose request, upstream and cache metrics of this instance in the Prometheus text format (admin only).
+
+    Returns:
+        Response: The metrics.
+    """
+
+    auth = request.authorization
+    if not auth or not verify_admin(auth.username, auth.password):
+        return Response('Authentication required', status=401, headers={'WWW-Authenticate': 'Basic realm="metrics"'})
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,163 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# histogram buckets in seconds, from a cache hit to a request running into the deadline
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0)
+
+def _label_key(labels: dict[str, str]) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    """
+    Monotonically increasing value per label set.
+    """
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f'{self.name}{_format_labels(key)} {value}'
+
+class Histogram:
+    """
+    Distribution of observed values per label set, in cumulative buckets.
+    """
+
+    def __init__(self, name: str, description: str, buckets: tuple = BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {} # bucket counts, sum and count per label set
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{_format_labels(key, (("le", str(bound)),))} {cumulative}'
+            yield f'{self.name}_bucket{_format_labels(key, (("le", "+Inf"),))} {count}'
+            yield f'{self.name}_sum{_format_labels(key)} {total}'
+            yield f'{self.name}_count{_format_labels(key)} {count}'
+
+# metrics are kept per process (i.e. per serverless instance) and reset on cold starts
+REQUEST_SECONDS = Histogram('reed_request_duration_seconds', 'Duration of requests by endpoint.')
+SPAN_SECONDS = Histogram('reed_span_duration_seconds', 'Duration of instrumented operations.')
+CACHE_LOOKUPS = Counter('reed_cache_lookups_total', 'Cache lookups by cache and result (hit, stale, miss).')
+UPSTREAM_RESPONSES = Counter('reed_upstream_responses_total', 'Upstream API responses by upstream and status (or error).')
+UPSTREAM_RETRIES = Counter('reed_upstream_retries_total', 'Retried upstream API calls.')
+SLEEP_SECONDS = Counter('reed_sleep_seconds_total', 'Time spent waiting for rate limits and backoff.')
+UPSTREAM_REJECTIONS = Counter('reed_upstream_rejections_total', 'Upstream API calls not made because the circuit breaker was open.')
+BREAKER_TRANSITIONS = Counter('reed_circuit_breaker_transitions_total', 'Circuit breaker state changes by upstream and new state.')
+DB_QUERIES = Counter('reed_db_queries_total', 'Database queries.')
+
+METRICS = (REQUEST_SECONDS, SPAN_SECONDS, CACHE_LOOKUPS, UPSTREAM_RESPONSES, UPSTREAM_RETRIES, UPSTREAM_REJECTIONS, BREAKER_TRANSITIONS,
+           SLEEP_SECONDS, DB_QUERIES)
+
+def record_span(name: str, seconds: float) -> None:
+    """
+    Record the duration of an operation, in the span histogram and in the trace of the current request.
+
+    Args:
+        name (str): Name of the operation.
+        seconds (float): Duration of the operation.
+    """
+
+    SPAN_SECONDS.observe(seconds, span=name)
+    if has_request_context():
+        g.setdefault('trace', []).append((name, seconds))
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time an operation as a span (also usable as a decorator).
+
+    Args:
+        name (str): Name of the operation.
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+def format_trace() -> str:
+    """
+    Summarize the spans of the current request, aggregated by name.
+
+    Returns:
+        str: The spans with their number and total duration.
+    """
+
+    totals: dict[str, list] = {}
+    for name, seconds in g.get('trace', []):
+        entry = totals.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+    return ', '.join(f'{name} {count}x {seconds * 1000:.1f}ms' for name, (count, seconds) in totals.items())
+
+def render_metrics() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics.
+    """
+
+    return '\n'.join(line for metric in METRICS for line in metric.render()) + '\n'
+
+def instrument_database() -> None:
+    """
+    Time all database queries as spans.
+    """
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        started = connection.info['query_started'].pop()
+        DB_QUERIES.inc()
+        record_span('db_query', time.perf_counter() - started)
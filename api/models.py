@@ -52,4 +52,85 @@ class User(UserMixin, db.Model):
     def get_semantic_scholar_api_key(self):
         if self.semantic_scholar_api_key_encrypted:
             return cipher_suite.decrypt(self.semantic_scholar_api_key_encrypted.encode()).decode()
-        return None 
\ No newline at end of file
+        return None
+
+class LibraryItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    library = db.Column(db.String(64), nullable=False, index=True)
+    key = db.Column(db.String(16), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    # formatted item fields (see fetch_recent_papers)
+    title = db.Column(db.Text)
+    authors = db.Column(db.Text) # JSON-encoded list of names
+    doi = db.Column(db.String(255))
+    abstract = db.Column(db.Text)
+    date = db.Column(db.String(64))
+    url = db.Column(db.Text)
+    date_added = db.Column(db.String(32), index=True)
+
+    __table_args__ = (db.UniqueConstraint('library', 'key'),)
+
+class LibraryLabel(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    library = db.Column(db.String(64), nullable=False)
+    key = db.Column(db.String(16), nullable=False) # key of the library item
+    kind = db.Column(db.String(16), nullable=False) # 'tag' or 'collection'
+    value = db.Column(db.String(255), nullable=False) # tag name or collection key
+
+    __table_args__ = (db.Index('ix_library_label_item', 'library', 'key'),)
+
+class LibrarySync(db.Model):
+    library = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    synced_at = db.Column(db.DateTime)
+    api_key_hash = db.Column(db.String(64)) # fingerprint of the API key of the last successful sync (see key_fingerprint)
+
+    # checkpoint of the full library import (see import_library)
+    import_start = db.Column(db.Integer, nullable=False, default=0)
+    import_version = db.Column(db.Integer, nullable=False, default=0) # library version at the checkpoint
+    import_complete = db.Column(db.Boolean, nullable=False, default=False)
+
+class LibraryChange(db.Model):
+    library = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0) # last library version notified by Zotero
+    notified_at = db.Column(db.Float, nullable=False) # unix timestamp
+
+class CacheEntry(db.Model):
+    key = db.Column(db.String(255), primary_key=True)
+    value = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.Float, nullable=False, index=True) # unix timestamp
+
+class RateLimitBucket(db.Model):
+    key = db.Column(db.String(128), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False) # unix timestamp
+
+class PaperMetadata(db.Model):
+    paper_id = db.Column(db.String(64), primary_key=True) # Semantic Scholar paper ID
+    data = db.Column(db.Text, nullable=False) # JSON-encoded paper record
+    fetched_at = db.Column(db.Float, nullable=False) # unix timestamp
+
+class PaperEmbedding(db.Model):
+    paper_id = db.Column(db.String(255), primary_key=True) # Semantic Scholar paper ID or 'DOI:<doi>'
+    vector = db.Column(db.LargeBinary, nullable=False) # float32 SPECTER embedding
+    fetched_at = db.Column(db.Float, nullable=False) # unix timestamp
+
+class CandidatePaper(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    library = db.Column(db.String(64), nullable=False, index=True) # library fingerprint of the user
+    paper_id = db.Column(db.String(64), nullable=False) # Semantic Scholar paper ID
+    data = db.Column(db.Text, nullable=False) # JSON-encoded paper (see Paper.to_dict)
+    added_at = db.Column(db.Float, nullable=False) # unix timestamp
+    shown_on = db.Column(db.Date) # day the paper was recommended, None if not yet
+
+    __table_args__ = (db.UniqueConstraint('library', 'paper_id'),)
+
+class DailyRecommendation(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    account = db.Column(db.String(64), nullable=False) # account fingerprint of the user (see account_fingerprint)
+    day = db.Column(db.Date, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False) # zlib-compressed JSON of seed papers and recommendations
+    created_at = db.Column(db.Float, nullable=False) # unix timestamp
+
+    __table_args__ = (db.UniqueConstraint('account', 'day'),)
@@ -0,0 +1,143 @@
+from dataclasses import dataclass, field
+from datetime import date as Date, datetime
+
+@dataclass(slots=True)
+class Paper:
+    """
+    A paper from the Zotero library or recommended by Semantic Scholar.
+    Dates are kept native and only formatted for display.
+    """
+
+    title: str
+    authors: list[str] = field(default_factory=list)
+    url: str = ''
+    abstract: str = ''
+    doi: str = ''
+    paper_id: str = '' # Semantic Scholar paper ID
+    published: Date | None = None
+    raw_date: str = '' # original date if it isn't an ISO date (Zotero dates are free-form)
+    zotero_url: str = ''
+
+    @classmethod
+    def from_semantic_scholar(cls, record: dict) -> 'Paper':
+        """
+        Create a paper from a Semantic Scholar paper record.
+
+        Args:
+            record (dict): The paper record.
+
+        Returns:
+            Paper: The paper.
+        """
+
+        published, raw_date = parse_date(record.get('publicationDate') or '')
+        return cls(
+            title=record.get('title') or '',
+            authors=[author.get('name', '') for author in record.get('authors') or []],
+            url=record.get('url') or '',
+            abstract=record.get('abstract') or '',
+            doi=(record.get('externalIds') or {}).get('DOI') or '',
+            paper_id=record.get('paperId') or '',
+            published=published,
+            raw_date=raw_date
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Paper':
+        """
+        Create a paper from its serialized form (see to_dict).
+        Dictionaries stored before papers were typed, with a display 'date', are supported as well.
+
+        Args:
+            data (dict): The serialized paper.
+
+        Returns:
+            Paper: The paper.
+        """
+
+        published, raw_date = parse_date(data.get('published') or data.get('date') or '')
+        return cls(
+            title=data.get('title', ''),
+            authors=list(data.get('authors', [])),
+            url=data.get('url', ''),
+            abstract=data.get('abstract', ''),
+            doi=data.get('doi', ''),
+            paper_id=data.get('paper_id', ''),
+            published=published,
+            raw_date=data.get('raw_date', raw_date),
+            zotero_url=data.get('zotero_url', '')
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the paper compactly for storage, leaving out empty fields.
+
+        Returns:
+            dict: The serialized paper.
+        """
+
+        data = {name: getattr(self, name) for name in self.__slots__ if getattr(self, name)}
+        if self.published:
+            data['published'] = self.published.isoformat()
+        return data
+
+    def to_json(self) -> dict:
+        """
+        Serialize the paper for the JSON APIs.
+
+        Returns:
+            dict: The paper with a display date.
+        """
+
+        data = {
+            'title': self.title,
+            'authors': self.authors,
+            'url': self.url,
+            'date': self.date,
+            'abstract': self.abstract
+        }
+        if self.doi:
+            data['doi'] = self.doi
+        if self.zotero_url:
+            data['zotero_url'] = self.zotero_url
+        return data
+
+    @property
+    def identity(self) -> str:
+        """
+        Returns:
+            str: The DOI (normalized) or, without one, the Semantic Scholar paper ID.
+        """
+
+        return self.doi.lower() if self.doi else self.paper_id
+
+    @property
+    def date(self) -> str:
+        """
+        Returns:
+            str: The date formatted for display.
+        """
+
+        return self.published.strftime('%B %d, %Y') if self.published else self.raw_date
+
+def parse_date(value: str) -> tuple[Date | None, str]:
+    """
+    Parse an ISO date (YYYY-MM-DD), or a display date of papers stored before dates were kept native.
+
+    Args:
+        value (str): The date to parse.
+
+    Returns:
+        tuple[Date | None, str]: The parsed date (None if it can't be parsed) and the original string if it wasn't parsed.
+    """
+
+    if not value:
+        return None, ''
+    try:
+        return Date.fromisoformat(value), ''
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, '%B %d, %Y').date(), ''
+    except ValueError:
+        return None, value
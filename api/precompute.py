@@ -0,0 +1,67 @@
+# usage: python -m api.precompute [--workers N] [--url URL]
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from api.models import db, User
+from api.index import app, logger, feed_cache, feed_cache_key, account_fingerprint, library_fingerprint, pack_feed, RecommendationPipeline, render_feed
+from api.resilience import Deadline
+
+def precompute_user(user_id: int, link: str) -> bool:
+    """
+    Precompute today's seed papers, recommendations and RSS feed of a user and store them in the database,
+    so requests are answered without upstream calls.
+
+    Args:
+        user_id (int): The ID of the user.
+        link (str): The URL the feed links to.
+
+    Returns:
+        bool: True if recommendations were stored, False otherwise.
+    """
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        keys = {
+            'zotero_api_key': user.get_zotero_api_key() or '',
+            'zotero_user_id': user.get_zotero_user_id() or '',
+            'semantic_scholar_api_key': user.get_semantic_scholar_api_key() or ''
+        }
+        if not all(keys.values()):
+            logger.debug("Skipping user %s without API keys", user_id)
+            return False
+
+        # no request deadline, the limiter keeps calls within each key's budget
+        pipeline = RecommendationPipeline(keys, n_seed_papers=10, n_recommendations=3, deadline=Deadline(None))
+        recommendations = pipeline.recommendations
+        pipeline.save()
+        if not recommendations or pipeline.stale:
+            logger.warning(f"No new recommendations for user {user_id}")
+            return False
+
+        packed = pack_feed(render_feed(recommendations, link), library=library_fingerprint(keys['zotero_user_id']))
+        feed_cache.set(feed_cache_key(account_fingerprint(keys)), packed)
+        logger.debug("Precomputed recommendations and feed for user %s", user_id)
+        return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute today's recommendations and feeds of all users.")
+    parser.add_argument('--workers', type=int, default=4, help="number of users processed concurrently")
+    parser.add_argument('--url', default='https://reed.vercel.app/', help="URL the feeds link to")
+    args = parser.parse_args()
+
+    with app.app_context():
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
+            User.zotero_user_id_encrypted.isnot(None),
+            User.zotero_api_key_encrypted.isnot(None),
+            User.semantic_scholar_api_key_encrypted.isnot(None)
+        )]
+
+    succeeded = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(precompute_user, user_id, args.url): user_id for user_id in user_ids}
+        for future in as_completed(futures):
+            try:
+                succeeded += future.result()
+            except Exception as e:
+                logger.error(f"Error precomputing user {futures[future]}: {str(e)}")
+
+    logger.info(f"Precomputed {succeeded} of {len(user_ids)} users")
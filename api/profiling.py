@@ -0,0 +1,56 @@
+import cProfile
+import io
+import pstats
+import time
+from flask import Response, g
+from api.metrics import format_trace
+
+PROFILE_PATHS = ('/', '/feed.xml') # besides everything under /api/
+PROFILE_STATS_LIMIT = 60 # functions listed in a profile report
+
+def is_profiled_path(path: str) -> bool:
+    return path in PROFILE_PATHS or path.startswith('/api/')
+
+def start_profile() -> None:
+    """
+    Start profiling the current request with cProfile.
+    """
+
+    g.profiler = cProfile.Profile()
+    g.profile_started = time.perf_counter()
+    g.profiler.enable()
+
+def profile_report(response: Response, sort: str = 'cumulative') -> Response:
+    """
+    Stop profiling the current request and replace its response with the profile report.
+    The report contains the status of the original response, the timed spans of the request
+    (e.g. upstream calls) in the order they completed, and the cProfile statistics.
+
+    Args:
+        response (Response): The original response of the request.
+        sort (str): Sort order of the statistics (e.g. 'cumulative', 'tottime').
+
+    Returns:
+        Response: The profile report.
+    """
+
+    g.profiler.disable()
+    elapsed = time.perf_counter() - g.profile_started
+
+    report = io.StringIO()
+    report.write(f"status: {response.status}\n")
+    report.write(f"duration: {elapsed * 1000:.1f}ms\n\n")
+    report.write("spans (database queries only in the totals):\n")
+    for name, seconds in g.get('trace', []):
+        if name != 'db_query':
+            report.write(f"  {name:<28} {seconds * 1000:>9.1f}ms\n")
+    report.write(f"totals: {format_trace()}\n")
+
+    report.write("\n")
+    try:
+        stats = pstats.Stats(g.profiler, stream=report).sort_stats(sort)
+    except KeyError:
+        stats = pstats.Stats(g.profiler, stream=report).sort_stats('cumulative')
+    stats.print_stats(PROFILE_STATS_LIMIT)
+
+    return Response(report.getvalue(), mimetype='text/plain', headers={'Cache-Control': 'no-store'})
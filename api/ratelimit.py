@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import insert, select, update
+from api.models import db, RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    In-process token bucket, shared between threads.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token from the bucket, going into debt if it is empty.
+
+        Returns:
+            float: Seconds to wait until the reserved token is available.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+def reserve_database_token(key: str, rate: float, capacity: float) -> float:
+    """
+    Take a token from a bucket stored in the database, so the budget is shared between instances.
+    The bucket is updated in its own transaction, so the caller's unit of work isn't committed with it.
+
+    Args:
+        key (str): The bucket key.
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens.
+
+    Returns:
+        float: Seconds to wait until the reserved token is available.
+    """
+
+    table = RateLimitBucket.__table__
+    now = time.time()
+    with db.engine.begin() as connection:
+        bucket = connection.execute(select(table.c.tokens, table.c.updated_at).where(table.c.key == key).with_for_update()).first()
+        if bucket is None:
+            tokens = capacity - 1
+            connection.execute(insert(table).values(key=key, tokens=tokens, updated_at=now))
+        else:
+            tokens = min(capacity, bucket.tokens + max(0.0, now - bucket.updated_at) * rate) - 1
+            connection.execute(update(table).where(table.c.key == key).values(tokens=tokens, updated_at=now))
+    return max(0.0, -tokens / rate)
+
+class RateLimiter:
+    """
+    Rate limiter with one token bucket per upstream and API key.
+    Callers only block once the budget of their key is used up.
+    """
+
+    def __init__(self, limits: dict[str, tuple[float, float]], backend: str = 'memory'):
+        """
+        Args:
+            limits (dict[str, tuple[float, float]]): Requests per second and burst size per upstream.
+            backend (str): 'memory' for per-process buckets, 'database' for buckets shared between instances.
+        """
+
+        self.limits = limits
+        self.backend = backend
+        self.total_wait: defaultdict[str, float] = defaultdict(float) # seconds spent throttled per upstream
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, key: str, rate: float, capacity: float) -> float:
+        if self.backend == 'database':
+            try:
+                return reserve_database_token(key, rate, capacity)
+            except Exception as e:
+                logger.error(f"Error reserving rate limit token from database: {str(e)}")
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket.reserve()
+
+    def acquire(self, upstream: str, api_key: str = '') -> float:
+        """
+        Wait until a call to the upstream is within the budget of the API key.
+
+        Args:
+            upstream (str): The upstream API (e.g. 'zotero').
+            api_key (str): The API key the call is made with.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+
+        rate, capacity = self.limits[upstream]
+        key = f"{upstream}:{hashlib.sha256(api_key.encode()).hexdigest()[:16]}" # never store the key itself
+        wait = self._reserve(key, rate, capacity)
+        if wait > 0:
+            logger.debug("Rate limiting %s for %.2f seconds", upstream, wait)
+            time.sleep(wait)
+            self.total_wait[upstream] += wait
+        return wait
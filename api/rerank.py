@@ -0,0 +1,48 @@
+import numpy as np
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors (rows) to unit length, so dot products are cosine similarities.
+
+    Args:
+        vectors (np.ndarray): The vectors.
+
+    Returns:
+        np.ndarray: The normalized vectors.
+    """
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def mmr_select(seed_vectors: list[bytes], candidate_vectors: list[bytes], k: int, diversity: float = 0.3) -> list[int]:
+    """
+    Select candidates by maximal marginal relevance: similarity to the centroid of the seed papers,
+    penalized by similarity to the candidates already selected, so near-duplicates aren't picked together.
+
+    Args:
+        seed_vectors (list[bytes]): Embeddings of the seed papers (float32).
+        candidate_vectors (list[bytes]): Embeddings of the candidates (float32).
+        k (int): Number of candidates to select.
+        diversity (float): Weight of the diversity penalty, 0 to rank by relevance only.
+
+    Returns:
+        list[int]: Indices of the selected candidates, best first.
+    """
+
+    seeds = normalize(np.stack([np.frombuffer(vector, dtype=np.float32) for vector in seed_vectors]))
+    candidates = normalize(np.stack([np.frombuffer(vector, dtype=np.float32) for vector in candidate_vectors]))
+
+    # relevance to the seed centroid and pairwise similarity of the candidates, in one pass each
+    relevance = candidates @ normalize(seeds.mean(axis=0, keepdims=True))[0]
+    similarity = candidates @ candidates.T
+
+    selected: list[int] = []
+    redundancy = np.zeros(len(candidates), dtype=np.float32) # maximum similarity to a selected candidate
+    available = np.ones(len(candidates), dtype=bool)
+    for _ in range(min(k, len(candidates))):
+        scores = np.where(available, (1 - diversity) * relevance - diversity * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+_random = random.Random() # own generator, independent of other users of the global one
+
+class Deadline:
+    """
+    Time budget of a request, carried through the recommendation pipeline.
+    """
+
+    def __init__(self, seconds: float | None):
+        """
+        Args:
+            seconds (float | None): Seconds until the deadline, None for no deadline.
+        """
+
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> float:
+        """
+        Returns:
+            float: Seconds left until the deadline (infinite if there is none).
+        """
+
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, default: float) -> float:
+        """
+        Timeout for a single upstream call that doesn't overrun the deadline.
+
+        Args:
+            default (float): Timeout to use if enough time is left.
+
+        Returns:
+            float: The timeout in seconds.
+        """
+
+        return min(default, self.remaining())
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date.
+
+    Args:
+        value (str | None): The header value.
+
+    Returns:
+        float | None: Seconds to wait, None if the header is missing or invalid.
+    """
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, retry_after: float | None = None, base: float = 0.5, cap: float = 8.0) -> float:
+    """
+    Jittered exponential backoff delay before the next attempt.
+    A Retry-After given by the server is honored as the minimum delay.
+
+    Args:
+        attempt (int): Number of the failed attempt, starting at 0.
+        retry_after (float | None): Seconds the server asked to wait.
+        base (float): Delay ceiling of the first retry.
+        cap (float): Maximum delay ceiling.
+
+    Returns:
+        float: Seconds to wait.
+    """
+
+    delay = _random.uniform(0, min(cap, base * 2 ** attempt)) # full jitter
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+class CircuitBreaker:
+    """
+    Circuit breaker of an upstream API, tracking the outcomes of recent calls.
+    The breaker opens when the error rate within the window reaches the threshold, and calls are rejected while it's open.
+    After the cooldown, a single probe call is let through (half open), which closes the breaker on success
+    and opens it again on failure.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, error_threshold: float = 0.5, min_calls: int = 5, window: float = 60.0, cooldown: float = 30.0,
+                 on_change: Callable[[str, str], None] | None = None):
+        """
+        Args:
+            name (str): Name of the upstream API.
+            error_threshold (float): Share of failed calls within the window that opens the breaker.
+            min_calls (int): Minimum number of calls within the window before the breaker can open.
+            window (float): Seconds of call outcomes considered.
+            cooldown (float): Seconds the breaker stays open before a probe call is let through.
+            on_change (Callable[[str, str], None] | None): Called with the name and new state on state changes.
+        """
+
+        self.name = name
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.on_change = on_change
+
+        self._state = self.CLOSED
+        self._outcomes: deque[tuple[float, bool]] = deque() # (time, success) of calls within the window
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Check if a call may be made. The caller has to record the outcome of an allowed call.
+
+        Returns:
+            bool: True if the breaker is closed or the call is the probe, False if the call should fail fast.
+        """
+
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self._opened_at >= self.cooldown:
+                self._transition(self.HALF_OPEN)
+
+            # one probe at a time, unless the probe never reported back
+            if self._state == self.HALF_OPEN and (self._probe_started is None or now - self._probe_started >= self.cooldown):
+                self._probe_started = now
+                return True
+            return False
+
+    def record(self, success: bool) -> None:
+        """
+        Record the outcome of a call.
+
+        Args:
+            success (bool): False if the upstream failed (server error or no response), True otherwise.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._probe_started = None
+                if success:
+                    self._outcomes.clear()
+                    self._failures = 0
+                    self._transition(self.CLOSED)
+                else:
+                    self._open(now)
+                return
+
+            # outcome of a call made before the breaker opened
+            if self._state == self.OPEN:
+                return
+
+            self._outcomes.append((now, success))
+            self._failures += not success
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                _, expired = self._outcomes.popleft()
+                self._failures -= not expired
+
+            if len(self._outcomes) >= self.min_calls and self._failures >= self.error_threshold * len(self._outcomes):
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        if self.on_change is not None:
+            self.on_change(self.name, state)
@@ -0,0 +1,156 @@
+import hashlib
+import heapq
+import math
+import random
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date as Date
+
+# 'uniform', 'recent' (weighted by position in the library, newest first), 'year' (stratified by publication year),
+# 'tag:<name>' or 'collection:<key>'
+SEED_STRATEGIES = ('uniform', 'recent', 'year', 'tag', 'collection')
+RECENT_HALF_LIFE = 50 # papers added after a paper until its weight is halved
+
+def parse_strategy(strategy: str) -> tuple[str, str]:
+    """
+    Split a strategy into its name and argument (the tag or collection key).
+
+    Args:
+        strategy (str): The strategy, e.g. 'recent' or 'tag:machine learning'.
+
+    Returns:
+        tuple[str, str]: The name and argument ('' if there is none).
+
+    Raises:
+        ValueError: If the strategy is unknown or misses its argument.
+    """
+
+    name, _, argument = strategy.partition(':')
+    if name not in SEED_STRATEGIES or (name in ('tag', 'collection')) != bool(argument):
+        raise ValueError(f"Invalid seed strategy: {strategy!r}")
+    return name, argument
+
+def seed_random(library: str, day: Date, strategy: str) -> random.Random:
+    """
+    Create the random generator of a library, day and strategy.
+    The seed is derived with SHA-256 (not hash(), which is salted per process), so every instance draws the same seeds,
+    and (library, day, strategy) identifies the seed papers and everything computed from them.
+
+    Args:
+        library (str): The library fingerprint.
+        day (date): The day.
+        strategy (str): The strategy.
+
+    Returns:
+        random.Random: The generator.
+    """
+
+    digest = hashlib.sha256(f"{library}:{day.isoformat()}:{strategy}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+@dataclass(slots=True)
+class SeedIndex:
+    """
+    Sampling index of a library, precomputed once per library version.
+    Only item keys are held, not the papers (see load_seed_index in api/index.py).
+    Entries refer to positions in keys, which are ordered newest added first.
+    """
+
+    keys: list[str]
+    log_weights: list[float] = field(default_factory=list) # natural log of the recency weight per position
+    years: dict[int | None, list[int]] = field(default_factory=dict) # positions by publication year
+    labels: dict[str, list[int]] = field(default_factory=dict) # positions by 'tag:<name>' and 'collection:<key>'
+
+    @classmethod
+    def build(cls, keys: list[str], years: list[int | None], labels: dict[str, list[str]] | None = None) -> 'SeedIndex':
+        """
+        Args:
+            keys (list[str]): Item keys of the library, newest added first.
+            years (list[int | None]): Publication year per item, None if unknown.
+            labels (dict[str, list[str]]): Labels ('tag:<name>', 'collection:<key>') by item key.
+
+        Returns:
+            SeedIndex: The index.
+        """
+
+        index = cls(keys, log_weights=[-math.log(2) * position / RECENT_HALF_LIFE for position in range(len(keys))])
+        for position, (key, year) in enumerate(zip(keys, years)):
+            index.years.setdefault(year, []).append(position)
+            for label in (labels or {}).get(key, ()):
+                index.labels.setdefault(label, []).append(position)
+        return index
+
+    def sample(self, rng: random.Random, n: int, strategy: str = 'uniform') -> list[str]:
+        """
+        Select n items with a strategy.
+        Items are drawn in a fixed order from the generator, so the same generator state gives the same items.
+
+        Args:
+            rng (random.Random): The generator (see seed_random).
+            n (int): Number of items to select.
+            strategy (str): The strategy (see SEED_STRATEGIES).
+
+        Returns:
+            list[str]: Keys of the selected items, all items of the strategy if there are at most n.
+        """
+
+        name, argument = parse_strategy(strategy)
+        positions = range(len(self.keys))
+
+        if name == 'recent':
+            # weighted sampling without replacement (Efraimidis-Spirakis): the n largest u ** (1 / weight),
+            # compared as log(weight) - log(-log(u)), as weights of old papers underflow in large libraries
+            keys = []
+            for log_weight in self.log_weights:
+                u = rng.random()
+                keys.append(log_weight - math.log(-math.log(u)) if u > 0 else -math.inf)
+            selected = heapq.nlargest(min(n, len(keys)), positions, key=keys.__getitem__)
+
+        elif name == 'year':
+            # shuffle each year, then take papers from the years in turn (in random order)
+            strata = [list(self.years[year]) for year in sorted(self.years, key=lambda year: (year is None, year or 0))]
+            for stratum in strata:
+                rng.shuffle(stratum)
+            rng.shuffle(strata)
+            selected = []
+            for turn in range(max(map(len, strata), default=0)):
+                selected.extend(stratum[turn] for stratum in strata if turn < len(stratum))
+            selected = selected[:n]
+
+        elif name in ('tag', 'collection'):
+            labeled = self.labels.get(f"{name}:{argument}", [])
+            selected = rng.sample(labeled, min(n, len(labeled)))
+
+        else:
+            selected = rng.sample(positions, min(n, len(self.keys)))
+
+        return [self.keys[position] for position in selected]
+
+class SeedIndexCache:
+    """
+    Bounded in-process LRU of seed indexes, keyed by tuples starting with the library fingerprint.
+    Only the newest index of a library is kept.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, SeedIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> SeedIndex | None:
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+            return index
+
+    def set(self, key: tuple, index: SeedIndex) -> None:
+        with self._lock:
+            # drop indexes of older versions of the library
+            for stale in [entry for entry in self._entries if entry[0] == key[0]]:
+                del self._entries[stale]
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
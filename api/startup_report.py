@@ -0,0 +1,61 @@
+# usage: python -m api.startup_report [--top N]
+import argparse
+import os
+import subprocess
+import sys
+
+# imports the app and answers a first request, reporting the time of each step
+PROBE = """
+import time
+start = time.perf_counter()
+from api.index import app
+imported = time.perf_counter()
+response = app.test_client().get('/login')
+first_request = time.perf_counter()
+print(f"import {imported - start:.3f} first_request {first_request - imported:.3f} status {response.status_code}")
+"""
+
+def parse_importtime(output: str) -> list[tuple[str, int, int]]:
+    """
+    Parse the output of python -X importtime.
+
+    Args:
+        output (str): The stderr of the interpreter.
+
+    Returns:
+        list[tuple[str, int, int]]: Module name, self and cumulative import time (microseconds) of each import.
+    """
+
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((module.strip(), int(own), int(cumulative)))
+    return imports
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report the cold start time of the app.")
+    parser.add_argument('--top', type=int, default=15, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit(result.returncode)
+
+    # slowest imports, cumulative time includes nested imports
+    imports = parse_importtime(result.stderr)
+    print(f"{'module':<40} {'cumulative [ms]':>16} {'self [ms]':>10}")
+    for module, own, cumulative in sorted(imports, key=lambda item: item[2], reverse=True)[:args.top]:
+        print(f"{module:<40} {cumulative / 1000:>16.1f} {own / 1000:>10.1f}")
+
+    timings = result.stdout.split()
+    print(f"\nimport of api.index: {float(timings[1]) * 1000:.1f} ms")
+    print(f"time to first request: {float(timings[3]) * 1000:.1f} ms (status {timings[5]})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# usage: python -m api.stream_listener [--url URL] [--refresh SECONDS] (long-running, outside of the serverless functions)
+import argparse
+import asyncio
+import json
+import os
+from websockets.asyncio.client import connect
+from websockets.exceptions import WebSocketException
+from api.models import User
+from api.index import app, logger, library_fingerprint, mark_library_changed
+from api.resilience import backoff_delay
+
+ZOTERO_STREAM_URL = os.getenv('ZOTERO_STREAM_URL', 'wss://stream.zotero.org') # e.g. local stand-in (see bench/)
+USER_REFRESH_SECONDS = 5 * 60 # interval of picking up new and changed API keys
+RECONNECT_MAX_SECONDS = 60 # maximum delay before reconnecting
+
+def load_subscriptions() -> dict[str, tuple[str, str]]:
+    """
+    Load the Zotero libraries and API keys of all users.
+
+    Returns:
+        dict[str, tuple[str, str]]: The library fingerprint and API key by streaming topic ('/users/<user ID>').
+    """
+
+    subscriptions = {}
+    with app.app_context():
+        users = User.query.filter(
+            User.zotero_user_id_encrypted.isnot(None),
+            User.zotero_api_key_encrypted.isnot(None)
+        ).all()
+        for user in users:
+            try:
+                user_id, api_key = user.get_zotero_user_id(), user.get_zotero_api_key()
+            except Exception as e:
+                logger.error(f"Error decrypting Zotero keys of user {user.id}: {str(e)}")
+                continue
+            if user_id and api_key:
+                subscriptions[f"/users/{user_id}"] = (library_fingerprint(user_id), api_key)
+    return subscriptions
+
+def record_change(library: str, version: int) -> None:
+    with app.app_context():
+        mark_library_changed(library, version)
+
+class StreamListener:
+    """
+    Client of the Zotero streaming API, subscribed to the libraries of all users.
+    Libraries reported as updated are marked as changed, so their mirrors are synced and their feeds
+    and recommendations regenerated on the next request.
+    """
+
+    def __init__(self, url: str = ZOTERO_STREAM_URL, refresh: float = USER_REFRESH_SECONDS):
+        """
+        Args:
+            url (str): URL of the streaming API.
+            refresh (float): Seconds between reloading the API keys of all users.
+        """
+
+        self.url = url
+        self.refresh = refresh
+        self.subscriptions: dict[str, tuple[str, str]] = {} # subscribed library and API key by topic
+        self.retry = 10.0 # seconds to wait before reconnecting, as requested by the server
+
+    async def run(self) -> None:
+        """
+        Listen until cancelled, reconnecting with backoff if the connection fails or is closed.
+        """
+
+        attempt = 0
+        while True:
+            try:
+                async with connect(self.url) as websocket:
+                    attempt = 0
+                    await self.listen(websocket)
+            except (OSError, WebSocketException) as e:
+                logger.error(f"Zotero streaming connection failed: {str(e)}")
+
+            # changes notified while disconnected are picked up by the periodic sync (see LIBRARY_SYNC_MAX_AGE_SECONDS)
+            delay = max(self.retry, backoff_delay(attempt, cap=RECONNECT_MAX_SECONDS))
+            attempt += 1
+            logger.info(f"Reconnecting to Zotero streaming API in {delay:.1f} seconds")
+            await asyncio.sleep(delay)
+
+    async def listen(self, websocket) -> None:
+        """
+        Subscribe to all libraries and handle events until the connection is closed.
+
+        Args:
+            websocket: The open connection.
+        """
+
+        self.subscriptions = {} # subscriptions end with the connection
+        refresher = asyncio.create_task(self.refresh_subscriptions(websocket))
+        try:
+            async for message in websocket:
+                await self.handle(json.loads(message))
+        finally:
+            refresher.cancel()
+
+    async def refresh_subscriptions(self, websocket) -> None:
+        """
+        Keep the subscriptions in line with the API keys of all users: subscribe to new libraries
+        and unsubscribe from libraries whose keys were removed or replaced.
+
+        Args:
+            websocket: The open connection.
+        """
+
+        while True:
+            subscriptions = await asyncio.to_thread(load_subscriptions)
+
+            # subscriptions are deleted by API key
+            removed = {api_key for topic, (_, api_key) in self.subscriptions.items() if subscriptions.get(topic) != self.subscriptions[topic]}
+            if removed:
+                await websocket.send(json.dumps({
+                    'action': 'deleteSubscriptions',
+                    'subscriptions': [{'apiKey': api_key} for api_key in removed]
+                }))
+
+            added = {topic: entry for topic, entry in subscriptions.items() if self.subscriptions.get(topic) != entry}
+            if added:
+                await websocket.send(json.dumps({
+                    'action': 'createSubscriptions',
+                    'subscriptions': [{'apiKey': api_key, 'topics': [topic]} for topic, (_, api_key) in added.items()]
+                }))
+
+            if added or removed:
+                logger.debug("Subscribed to %s libraries, unsubscribed from %s", len(added), len(removed))
+            self.subscriptions = subscriptions
+            await asyncio.sleep(self.refresh)
+
+    async def handle(self, message: dict) -> None:
+        """
+        Handle an event of the streaming API.
+
+        Args:
+            message (dict): The event.
+        """
+
+        event = message.get('event')
+        if event == 'connected':
+            self.retry = message.get('retry', self.retry * 1000) / 1000
+            logger.info("Connected to Zotero streaming API")
+
+        elif event == 'subscriptionsCreated':
+            for error in message.get('errors', []):
+                logger.error(f"Zotero streaming subscription failed: {error.get('error')}") # without the API key
+            logger.debug("Created %s subscriptions", len(message.get('subscriptions', [])))
+
+        elif event == 'topicUpdated':
+            entry = self.subscriptions.get(message.get('topic'))
+            if entry is not None:
+                await asyncio.to_thread(record_change, entry[0], int(message.get('version', 0)))
+
+        elif event in ('topicAdded', 'topicRemoved'):
+            logger.debug("Zotero streaming topic %s", event[len('topic'):].lower())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Listen to Zotero library changes and mark the affected mirrors, feeds and recommendations.")
+    parser.add_argument('--url', default=ZOTERO_STREAM_URL, help="URL of the Zotero streaming API")
+    parser.add_argument('--refresh', type=float, default=USER_REFRESH_SECONDS, help="seconds between reloading the API keys of all users")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(StreamListener(args.url, args.refresh).run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # imported on first use, to keep cold starts fast
+    import requests
+    from pyzotero import zotero
+
+POOL_MAXSIZE = 20 # connections kept alive per host
+UPSTREAM_WORKERS = 8 # threads for overlapping independent upstream calls
+ZOTERO_API_URL = os.getenv('ZOTERO_API_URL', 'https://api.zotero.org').rstrip('/') # e.g. local stand-in (see bench/)
+
+_lock = threading.Lock()
+_session: requests.Session | None = None
+_zotero_http_client = None
+_zotero_class = None # Zotero client class sharing _zotero_http_client
+
+# shared pool for overlapping independent upstream calls
+executor = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream')
+
+def http_session() -> requests.Session:
+    """
+    Get the shared HTTP session, which keeps connections to upstream APIs alive between requests.
+
+    Returns:
+        requests.Session: The session.
+    """
+
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def zotero_client(user_id: str, api_key: str) -> zotero.Zotero:
+    """
+    Create a Zotero client for a library, sharing one pooled HTTP client between all libraries.
+    Credentials are sent per request, so the HTTP client holds no user state.
+
+    Args:
+        user_id (str): The Zotero user ID.
+        api_key (str): The Zotero API key.
+
+    Returns:
+        zotero.Zotero: The Zotero client.
+    """
+
+    global _zotero_class, _zotero_http_client
+    if _zotero_class is None:
+        with _lock:
+            if _zotero_class is None:
+                from pyzotero import zotero
+
+                # Zotero clients close their HTTP client when garbage collected, which would break the shared one
+                class SharedClientZotero(zotero.Zotero):
+                    def __del__(self) -> None:
+                        pass
+
+                client = SharedClientZotero(user_id, 'user', api_key)
+                client.endpoint = ZOTERO_API_URL
+                _zotero_http_client = client.client
+                _zotero_class = SharedClientZotero
+                return client
+
+    client = _zotero_class(user_id, 'user', api_key, client=_zotero_http_client)
+    client.endpoint = ZOTERO_API_URL
+    return client
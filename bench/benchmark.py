@@ -0,0 +1,154 @@
+# usage: python -m bench.benchmark [--clients 8] [--requests 5] [--latency 0.05] [--error-rate 0.05]
+"""
+Benchmark /, /api/recommendations and /feed.xml against local Zotero and Semantic Scholar stand-ins, without network access.
+Each endpoint is measured with its own fresh users: the first request of each user is cold (nothing cached),
+the following ones are warm. Reports throughput and p50/p99 latency per endpoint and phase.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet
+from bench.fake_upstreams import FakeConfig, start_server
+
+ENDPOINTS = ('/', '/api/recommendations', '/feed.xml')
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values (list[float]): The values.
+        q (float): The percentile (0-100).
+
+    Returns:
+        float: The percentile of the values.
+    """
+
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+def configure_environment(upstream_url: str, database_url: str | None) -> None:
+    """
+    Point the app at the stand-ins and a scratch database. Must run before the app is imported.
+    """
+
+    os.environ['ZOTERO_API_URL'] = upstream_url
+    os.environ['S2_API_URL'] = upstream_url
+    os.environ.setdefault('ENCRYPTION_KEY', Fernet.generate_key().decode())
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['DATABASE_URL'] = database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+def start_app():
+    """
+    Serve the app on a local port, with a thread per request.
+
+    Returns:
+        tuple: The app module and the base URL it is served at.
+    """
+
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING) # no access log per request
+    from api import index
+    from api.models import db
+
+    index.app.config['WTF_CSRF_ENABLED'] = False
+    with index.app.app_context():
+        db.create_all()
+
+    server = make_server('127.0.0.1', 0, index.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return index, f"http://127.0.0.1:{server.server_port}"
+
+def create_client(index, base_url: str, name: str):
+    """
+    Register and log in a user with its own Zotero library.
+
+    Returns:
+        tuple: The logged in session and the query parameters of the user's feed URL.
+    """
+
+    import requests
+
+    keys = {'zotero_user_id': name, 'zotero_api_key': f"zotero-key-{name}", 'semantic_scholar_api_key': f"s2-key-{name}"}
+    session = requests.Session()
+    # don't follow redirects to /, so the first measured request is the first to load recommendations
+    session.post(f"{base_url}/register", data={'username': name, 'email': f"{name}@example.org", 'password': 'bench'}, allow_redirects=False)
+    session.post(f"{base_url}/login", data={'username': name, 'password': 'bench'}, allow_redirects=False)
+    session.post(f"{base_url}/api/keys", data=keys, allow_redirects=False)
+
+    feed_params = {name: index.cipher_suite.encrypt(value.encode()).decode() for name, value in keys.items()}
+    feed_params['feed'] = index.account_fingerprint(keys)
+    return session, feed_params
+
+def run_endpoint(index, base_url: str, endpoint: str, clients: int, requests_per_client: int) -> dict:
+    """
+    Let concurrent clients request an endpoint, each starting cold.
+
+    Returns:
+        dict: Latencies by phase ('cold', 'warm'), errors and wall time.
+    """
+
+    users = [create_client(index, base_url, f"{endpoint.strip('/').replace('/', '-') or 'index'}-{i}") for i in range(clients)]
+    latencies = {'cold': [], 'warm': []}
+    errors = []
+    lock = threading.Lock()
+
+    def client(session, feed_params):
+        for i in range(requests_per_client):
+            started = time.perf_counter()
+            response = session.get(f"{base_url}{endpoint}", params=feed_params if endpoint == '/feed.xml' else None)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies['cold' if i == 0 else 'warm'].append(elapsed)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        for future in [executor.submit(client, *user) for user in users]:
+            future.result()
+    return {'latencies': latencies, 'errors': errors, 'wall': time.perf_counter() - started}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the app against local upstream stand-ins.")
+    parser.add_argument('--clients', type=int, default=8, help="concurrent clients per endpoint")
+    parser.add_argument('--requests', type=int, default=5, help="requests per client (the first one is cold)")
+    parser.add_argument('--latency', type=float, default=FakeConfig.latency, help="upstream latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=FakeConfig.error_rate, help="fraction of upstream requests answered with 429")
+    parser.add_argument('--incomplete-rate', type=float, default=FakeConfig.incomplete_rate, help="fraction of incomplete recommendations")
+    parser.add_argument('--library-size', type=int, default=FakeConfig.library_size, help="items per Zotero library")
+    parser.add_argument('--database-url', default=None, help="database to use, by default a scratch SQLite database")
+    args = parser.parse_args()
+
+    upstreams = start_server(FakeConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        incomplete_rate=args.incomplete_rate,
+        library_size=args.library_size
+    ))
+    configure_environment(f"http://127.0.0.1:{upstreams.server_port}", args.database_url)
+    index, base_url = start_app()
+
+    print(f"{'endpoint':<22} {'phase':<5} {'n':>5} {'p50 [ms]':>9} {'p99 [ms]':>9} {'mean [ms]':>10} {'req/s':>7} {'errors':>6}")
+    for endpoint in ENDPOINTS:
+        result = run_endpoint(index, base_url, endpoint, args.clients, args.requests)
+        total = sum(len(values) for values in result['latencies'].values())
+        for phase, values in result['latencies'].items():
+            if not values:
+                continue
+            print(f"{endpoint:<22} {phase:<5} {len(values):>5} {percentile(values, 50) * 1000:>9.1f} "
+                  f"{percentile(values, 99) * 1000:>9.1f} {statistics.mean(values) * 1000:>10.1f} "
+                  f"{total / result['wall']:>7.1f} {len(result['errors']):>6}")
+
+    print(f"\nupstream requests: {dict(sorted(upstreams.RequestHandlerClass.requests.items()))}")
+    sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# usage: python -m bench.fake_stream [--port 8766] [--interval 10]
+"""
+Local stand-in for the Zotero streaming API (wss://stream.zotero.org).
+Point the listener at it with ZOTERO_STREAM_URL. Library changes are published with FakeStream.publish,
+or from the command line every --interval seconds for a random subscribed library.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+class FakeStream:
+    """
+    Streaming API stand-in, serving on its own event loop in a background thread.
+    """
+
+    def __init__(self, retry_ms: int = 1000):
+        self.retry_ms = retry_ms # reconnect delay sent to clients
+        self.port = None
+        self.subscriptions: dict[ServerConnection, dict[str, set[str]]] = {} # topics by API key, per connection
+        self.versions: dict[str, int] = {} # library version by topic
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+
+    def start(self, port: int = 0) -> 'FakeStream':
+        """
+        Start serving in a background thread.
+
+        Args:
+            port (int): Port to listen on, 0 for any free port.
+
+        Returns:
+            FakeStream: The running stand-in (see port).
+        """
+
+        async def serve_forever():
+            async with serve(self.handler, '127.0.0.1', port) as server:
+                self.port = server.sockets[0].getsockname()[1]
+                self._started.set()
+                await asyncio.Future()
+
+        threading.Thread(target=self.loop.run_until_complete, args=(serve_forever(),), daemon=True).start()
+        self._started.wait()
+        return self
+
+    @property
+    def topics(self) -> set[str]:
+        return {topic for keys in list(self.subscriptions.values()) for topics in keys.values() for topic in topics}
+
+    async def handler(self, websocket: ServerConnection) -> None:
+        keys = self.subscriptions[websocket] = {}
+        await websocket.send(json.dumps({'event': 'connected', 'retry': self.retry_ms}))
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                if request.get('action') == 'createSubscriptions':
+                    created, errors = [], []
+                    for subscription in request.get('subscriptions', []):
+                        if not subscription.get('apiKey'):
+                            errors.append({'error': "Missing API key"})
+                            continue
+                        topics = subscription.get('topics', [])
+                        keys.setdefault(subscription['apiKey'], set()).update(topics)
+                        created.append({'apiKey': subscription['apiKey'], 'topics': topics})
+                    await websocket.send(json.dumps({'event': 'subscriptionsCreated', 'subscriptions': created, 'errors': errors}))
+
+                elif request.get('action') == 'deleteSubscriptions':
+                    for subscription in request.get('subscriptions', []):
+                        keys.pop(subscription.get('apiKey'), None)
+                    await websocket.send(json.dumps({'event': 'subscriptionsDeleted'}))
+        except ConnectionClosed:
+            pass # client went away without closing
+        finally:
+            del self.subscriptions[websocket]
+
+    async def _publish(self, topic: str, version: int) -> int:
+        message = json.dumps({'event': 'topicUpdated', 'topic': topic, 'version': version})
+        notified = 0
+        for websocket, keys in list(self.subscriptions.items()):
+            if any(topic in topics for topics in keys.values()):
+                try:
+                    await websocket.send(message)
+                    notified += 1
+                except ConnectionClosed:
+                    pass
+        return notified
+
+    def publish(self, topic: str, version: int | None = None) -> int:
+        """
+        Notify the subscribers of a library about a change.
+
+        Args:
+            topic (str): The library topic, e.g. '/users/123'.
+            version (int | None): The new library version, by default the previous one plus one.
+
+        Returns:
+            int: Number of notified connections.
+        """
+
+        version = self.versions[topic] = version or self.versions.get(topic, 1) + 1
+        return asyncio.run_coroutine_threadsafe(self._publish(topic, version), self.loop).result()
+
+    async def _disconnect(self) -> None:
+        for websocket in list(self.subscriptions):
+            await websocket.close()
+
+    def disconnect(self) -> None:
+        """
+        Close all connections, as on a server restart. Clients reconnect after the retry delay and subscribe again.
+        """
+
+        asyncio.run_coroutine_threadsafe(self._disconnect(), self.loop).result()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local Zotero streaming API stand-in.")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--interval', type=float, default=10.0, help="seconds between changes of a random subscribed library")
+    args = parser.parse_args()
+
+    stream = FakeStream().start(args.port)
+    print(f"Serving fake Zotero streaming API on ws://127.0.0.1:{stream.port} (ZOTERO_STREAM_URL)")
+    try:
+        while True:
+            threading.Event().wait(args.interval)
+            topics = sorted(stream.topics)
+            if topics:
+                topic = random.choice(topics)
+                print(f"{topic} changed, notified {stream.publish(topic)} connections")
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+# usage: python -m bench.fake_upstreams [--port 8765] [--latency 0.05] [--error-rate 0.05] [--incomplete-rate 0.3]
+"""
+Local stand-ins for the Zotero items API and the Semantic Scholar recommendations and batch endpoints.
+Point the app at them with ZOTERO_API_URL and S2_API_URL (both served on the same port).
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.05 # seconds added to every response
+    error_rate: float = 0.0 # fraction of requests answered with 429
+    retry_after: float = 0.0 # Retry-After of injected 429 responses
+    incomplete_rate: float = 0.3 # fraction of recommendations missing required fields
+    library_size: int = 300 # items per Zotero library
+    seed: int = 0
+
+def zotero_item(user_id: str, n: int) -> dict:
+    """
+    Deterministic Zotero item n of a library, in the shape returned by the items API.
+    """
+
+    key = f"K{n:07d}"
+    return {
+        'key': key,
+        'version': 1,
+        'library': {'type': 'user', 'id': user_id},
+        'data': {
+            'key': key,
+            'version': 1,
+            'itemType': 'journalArticle',
+            'title': f"Library paper {n} of {user_id}",
+            'creators': [{'creatorType': 'author', 'name': f"Author {n % 17}"}],
+            'abstractNote': f"Abstract of library paper {n}.",
+            'DOI': f"10.5555/{user_id}.{n}" if n % 10 else '', # some items without DOI
+            'date': f"{2000 + n % 25}-{1 + n % 12:02d}-{1 + n % 28:02d}",
+            'url': f"https://example.org/{user_id}/{n}",
+            'dateAdded': (datetime(2020, 1, 1) + timedelta(minutes=n)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+    }
+
+def s2_paper(paper_id: str, complete: bool = True) -> dict:
+    """
+    Deterministic Semantic Scholar paper record, optionally missing required fields.
+    """
+
+    n = zlib.crc32(paper_id.encode())
+    return {
+        'paperId': paper_id,
+        'externalIds': {'DOI': f"10.5555/s2.{paper_id}"},
+        'title': f"Recommended paper {paper_id}",
+        'authors': [{'authorId': str(n % 997), 'name': f"Researcher {n % 997}"}],
+        'url': f"https://www.semanticscholar.org/paper/{paper_id}",
+        'publicationDate': f"{2015 + n % 10}-{1 + n % 12:02d}-{1 + n % 28:02d}",
+        'abstract': f"Abstract of recommended paper {paper_id}." if complete else None
+    }
+
+def s2_embedding(paper_id: str, dimensions: int = 768) -> dict:
+    """
+    Deterministic SPECTER-like embedding of a paper.
+    """
+
+    rng = random.Random(zlib.crc32(paper_id.encode()))
+    return {'model': 'specter_v2', 'vector': [rng.gauss(0, 1) for _ in range(dimensions)]}
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    config: FakeConfig
+    random: random.Random
+    lock: threading.Lock
+    requests: dict[str, int]
+
+    def log_message(self, format, *args):
+        pass # keep benchmark output readable
+
+    def _count(self, name: str) -> None:
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def _inject(self) -> bool:
+        time.sleep(self.config.latency)
+        with self.lock:
+            fail = self.random.random() < self.config.error_rate
+        if fail:
+            self._count('429')
+            self.send_response(429)
+            self.send_header('Retry-After', str(self.config.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        return fail
+
+    def _json(self, data, headers: dict = None) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        match = re.fullmatch(r'/users/([^/]+)/(items/top|deleted)', url.path)
+        if not match:
+            self.send_error(404)
+            return
+        if self._inject():
+            return
+
+        user_id, resource = match.groups()
+        headers = {'Last-Modified-Version': '1'}
+        self._count(f"zotero:{resource}")
+        if resource == 'deleted':
+            self._json({'collections': [], 'searches': [], 'items': [], 'tags': [], 'settings': []}, headers)
+            return
+
+        # items are unchanged after the first version
+        if int(params.get('since', 0)) >= 1:
+            self._json([], headers)
+            return
+
+        size = self.config.library_size
+        order = range(size) if params.get('direction') == 'asc' else range(size - 1, -1, -1)
+        start, limit = int(params.get('start', 0)), min(int(params.get('limit', 25)), 100)
+        page = [zotero_item(user_id, n) for n in list(order)[start:start + limit]]
+        headers['Total-Results'] = str(size)
+        if start + limit < size:
+            next_params = urlencode({**params, 'start': start + limit})
+            headers['Link'] = f'<http://{self.headers["Host"]}{url.path}?{next_params}>; rel="next"'
+        self._json(page, headers)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if url.path not in ('/recommendations/v1/papers', '/recommendations/v1/papers/', '/graph/v1/paper/batch'):
+            self.send_error(404)
+            return
+        if self._inject():
+            return
+
+        if url.path == '/graph/v1/paper/batch':
+            self._count('s2:batch')
+            if 'embedding' in params.get('fields', ''):
+                self._json([{'paperId': paper_id, 'embedding': s2_embedding(paper_id)} for paper_id in payload.get('ids', [])])
+            else:
+                self._json([s2_paper(paper_id) for paper_id in payload.get('ids', [])])
+            return
+
+        self._count('s2:recommendations')
+        seeds = ','.join(sorted(payload.get('positivePaperIds', [])))
+        rng = random.Random(f"{self.config.seed}:{seeds}")
+        with self.lock:
+            incomplete = [self.random.random() < self.config.incomplete_rate for _ in range(int(params.get('limit', 100)))]
+        papers = [s2_paper(f"{rng.getrandbits(40):010x}", complete=not missing) for missing in incomplete]
+        self._json({'recommendedPapers': papers})
+
+def start_server(config: FakeConfig, port: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the fake upstreams in a background thread.
+
+    Args:
+        config (FakeConfig): Behavior of the fake upstreams.
+        port (int): Port to listen on, 0 for any free port.
+
+    Returns:
+        ThreadingHTTPServer: The running server (see server_port and requests counters on its handler).
+    """
+
+    handler = type('Handler', (FakeUpstreamHandler,), {
+        'config': config,
+        'random': random.Random(config.seed),
+        'lock': threading.Lock(),
+        'requests': {}
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve local Zotero and Semantic Scholar stand-ins.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=FakeConfig.latency, help="seconds added to every response")
+    parser.add_argument('--error-rate', type=float, default=FakeConfig.error_rate, help="fraction of requests answered with 429")
+    parser.add_argument('--retry-after', type=float, default=FakeConfig.retry_after, help="Retry-After of injected 429 responses")
+    parser.add_argument('--incomplete-rate', type=float, default=FakeConfig.incomplete_rate, help="fraction of incomplete recommendations")
+    parser.add_argument('--library-size', type=int, default=FakeConfig.library_size, help="items per Zotero library")
+    args = parser.parse_args()
+
+    config = FakeConfig(args.latency, args.error_rate, args.retry_after, args.incomplete_rate, args.library_size)
+    server = start_server(config, args.port)
+    print(f"Serving fake upstreams on http://127.0.0.1:{server.server_port} (ZOTERO_API_URL and S2_API_URL)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
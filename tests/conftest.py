@@ -0,0 +1,8 @@
+import os
+import tempfile
+from cryptography.fernet import Fernet
+
+# the app reads its configuration on import
+os.environ.setdefault('ENCRYPTION_KEY', Fernet.generate_key().decode())
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault('LIBRARY_NOTIFICATIONS', 'true')
@@ -0,0 +1,104 @@
+"""
+StreamListener against the local streaming API stand-in (bench/fake_stream.py).
+"""
+import asyncio
+import threading
+import time
+import pytest
+from api import index
+from api.index import app, feed_cache, feed_cache_key, is_fresh_feed, library_fingerprint, pack_feed
+from api.models import db, LibraryChange, User
+from api.stream_listener import StreamListener
+from bench.fake_stream import FakeStream
+
+TOPIC = '/users/123'
+
+def wait_for(condition, timeout: float = 5.0):
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        value = condition()
+        if value:
+            return value
+        time.sleep(0.02)
+    raise AssertionError("Timed out waiting for condition")
+
+@pytest.fixture(autouse=True)
+def database(monkeypatch):
+    monkeypatch.setattr(index, 'LIBRARY_NOTIFICATIONS', True)
+    with app.app_context():
+        db.create_all()
+        user = User(username='reader', email='reader@example.org')
+        user.set_zotero_user_id('123')
+        user.set_zotero_api_key('zotero-key')
+        db.session.add(user)
+        db.session.commit()
+    yield
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def stream():
+    return FakeStream(retry_ms=300).start()
+
+@pytest.fixture
+def listener(stream):
+    listener = StreamListener(f"ws://127.0.0.1:{stream.port}", refresh=0.1)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(listener.run())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    yield listener
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(timeout=5)
+
+def library_change() -> LibraryChange | None:
+    with app.app_context():
+        return db.session.get(LibraryChange, library_fingerprint('123'))
+
+def test_subscribes_and_records_changes(stream, listener):
+    wait_for(lambda: TOPIC in stream.topics)
+    assert stream.subscriptions and all(set(keys) == {'zotero-key'} for keys in stream.subscriptions.values())
+
+    assert stream.publish(TOPIC, 42) == 1
+    change = wait_for(library_change)
+    assert change.version == 42
+
+    # changes of other libraries are ignored
+    stream.publish('/users/999', 7)
+    time.sleep(0.2)
+    with app.app_context():
+        assert LibraryChange.query.count() == 1
+
+def test_change_invalidates_cached_feed(stream, listener):
+    library = library_fingerprint('123')
+    cache_key = feed_cache_key('account')
+    with app.app_context():
+        feed_cache.set(cache_key, pack_feed(b'<rss/>', library=library))
+        assert is_fresh_feed(feed_cache.get(cache_key))
+
+    wait_for(lambda: TOPIC in stream.topics)
+    stream.publish(TOPIC, 43)
+    wait_for(library_change)
+    with app.app_context():
+        assert not is_fresh_feed(feed_cache.get(cache_key))
+
+def test_reconnects_after_server_retry(stream, listener):
+    wait_for(lambda: TOPIC in stream.topics)
+    assert listener.retry == 0.3
+
+    disconnected = time.monotonic()
+    stream.disconnect()
+    wait_for(lambda: not stream.subscriptions)
+    wait_for(lambda: TOPIC in stream.topics)
+    assert time.monotonic() - disconnected >= 0.3
+
+    # subscriptions are renewed on the new connection
+    stream.publish(TOPIC, 44)
+    assert wait_for(lambda: (change := library_change()) and change.version == 44)